@@ -1,5 +1,6 @@
 # app/__init__.py
 import os
+import sqlite3
 from dotenv import load_dotenv
 from flask import Flask
 from flask_caching import Cache
@@ -8,9 +9,18 @@ from datetime import timedelta
 # .env 파일 로드
 load_dotenv()
 
+# [수정] gunicorn 워커들이 함께 쓰는 파일 기반 캐시
+# - 캐시 키에 데이터 세대 번호가 포함되므로 업데이트 후 별도의 cache.clear()가 필요 없습니다.
+# - [수정] 워커마다 메모리 예산(CACHE_MEMORY_BUDGET 바이트) 안에서 LRU로 유지하는 1단 캐시를 앞에 둡니다.
+# [수정] 캐시/잠금/프로파일 폴더 기본값은 DB 경로처럼 실행 위치와 무관하게 프로젝트 루트 기준
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.environ.get('CACHE_DIR', os.path.join(PROJECT_ROOT, '.flask_cache'))
+
 cache = Cache(config={
-    'CACHE_TYPE': 'simple',
-    'CACHE_DEFAULT_TIMEOUT': 3600
+    'CACHE_TYPE': 'app.cache_backend.BudgetedCache',
+    'CACHE_DIR': CACHE_DIR,
+    'CACHE_DEFAULT_TIMEOUT': 3600,
+    'CACHE_MEMORY_BUDGET': int(os.environ.get('CACHE_MEMORY_BUDGET', 128 * 1024 * 1024)),
 })
 
 def create_app():
@@ -24,6 +34,20 @@ def create_app():
 
     cache.init_app(app)
 
+    # [추가] 요청 단계별 시간 측정 (Server-Timing 헤더, /api/metrics)
+    from . import metrics
+    metrics.init_app(app)
+
+    # DB 스키마 준비 (기존 DB에는 year/month 컬럼과 인덱스를 제자리에서 추가)
+    # [수정] 스키마가 최신이면 시작 시 DB에 쓰지 않음 → 적재 중에도 워커가 바로 뜸
+    # - 스키마 변경은 migrate_data.py / python database_setup.py 실행 시 적용되고, 여기서는 잠겨 있으면 건너뜀
+    from database_setup import schema_is_current, create_table
+    if not schema_is_current():
+        try:
+            create_table()
+        except sqlite3.OperationalError as e:
+            print(f"DB 스키마 준비를 건너뜁니다 (다른 작업이 DB를 사용 중): {e}")
+
     with app.app_context():
         from . import routes # 라우트 모듈을 임포트합니다.
 
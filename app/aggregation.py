@@ -0,0 +1,354 @@
+# app/aggregation.py
+# 집계 결과(DataFrame)를 대시보드 행(row) 트리로 변환하는 엔진
+# - 데이터를 한 번만 피벗(키 × 월 행렬)한 뒤, 행렬 연산과 선형 순회로 트리/소계/증감률을 만듭니다.
+import numpy as np
+
+CATEGORY_ORDER = ["안경테", "선글라스", "클립", "모던"]
+
+
+def _ordered(values, preferred):
+    """preferred 순서를 우선하고 나머지는 이름순으로 정렬"""
+    present = set(values)
+    head = [v for v in preferred if v in present]
+    return head + sorted(v for v in present if v not in set(preferred))
+
+
+def _pct_change(net, comp_net):
+    return round((net - comp_net) / abs(comp_net) * 100, 1) if comp_net != 0 else None
+
+
+def _month_cells(months, net_row, neg_row):
+    return {m: {'net': int(n), 'neg': int(g)} for m, n, g in zip(months, net_row, neg_row)}
+
+
+def pivot_months(agg, keys, months):
+    """(keys + month_str) 단위 net/neg 집계를 키 × 월 행렬로 피벗합니다.
+
+    반환: (키 튜플 리스트, net 행렬, neg 행렬) - 행렬의 열 순서는 months와 같습니다.
+    """
+    if agg.empty:
+        empty = np.zeros((0, len(months)), dtype=np.int64)
+        return [], empty, empty.copy()
+
+    grouped = agg.groupby(keys + ['month_str'])[['net', 'neg']].sum()
+    table = grouped.unstack('month_str', fill_value=0)
+    net = table['net'].reindex(columns=months, fill_value=0).to_numpy(dtype=np.int64)
+    neg = table['neg'].reindex(columns=months, fill_value=0).to_numpy(dtype=np.int64)
+    index = [k if isinstance(k, tuple) else (k,) for k in table.index]
+    return index, net, neg
+
+
+def _totals_map(df, keys, net_col, neg_col):
+    """keys → (net, neg) 딕셔너리 (비교년도 합계 조회용)"""
+    if df is None or df.empty:
+        return {}
+    grouped = df.groupby(keys)[[net_col, neg_col]].sum()
+    return {
+        (k if isinstance(k, tuple) else (k,)): (int(n), int(g))
+        for k, n, g in zip(grouped.index, grouped[net_col].to_numpy(), grouped[neg_col].to_numpy())
+    }
+
+
+def build_main_rows(agg, months, subtotal_targets, comp_data=None):
+    """창고 → 구분 트리와 합계 행을 만듭니다 (process_data 출력 형식).
+
+    agg: warehouse, category, month_str, net, neg 컬럼
+    comp_data: warehouse, category, comp_net, comp_neg 컬럼 (비교년도, 없으면 None)
+    """
+    index, net, neg = pivot_months(agg, ['warehouse', 'category'], months)
+    tot_net, tot_neg = net.sum(axis=1), neg.sum(axis=1)
+
+    # 창고별 행 위치를 한 번에 수집
+    wh_positions = {}
+    for pos, (wh, cat) in enumerate(index):
+        wh_positions.setdefault(wh, {})[cat] = pos
+
+    has_comp = comp_data is not None
+    comp_cat = _totals_map(comp_data, ['warehouse', 'category'], 'comp_net', 'comp_neg') if has_comp else {}
+    comp_wh = _totals_map(comp_data, ['warehouse'], 'comp_net', 'comp_neg') if has_comp else {}
+
+    warehouses_all = list(wh_positions)
+    if not subtotal_targets: subtotal_targets = warehouses_all
+    final_order = _ordered(warehouses_all, subtotal_targets)
+
+    sub_net = np.zeros(len(months), dtype=np.int64)
+    sub_neg = np.zeros(len(months), dtype=np.int64)
+    total_sub = {'net': 0, 'neg': 0}
+    if has_comp: total_sub['compare'] = {'net': 0, 'neg': 0}
+
+    def create_total_row():
+        row = {'name': '합계', 'is_subtotal': True, 'data': _month_cells(months, sub_net, sub_neg), 'total': total_sub}
+        if has_comp:
+            row['compare'] = total_sub['compare']
+            if total_sub['compare']['net'] != 0:
+                row['pct_change'] = _pct_change(total_sub['net'], total_sub['compare']['net'])
+        return row
+
+    rows = []
+    is_total_added = False
+    for wh in final_order:
+        in_subtotal = wh in subtotal_targets
+        if not in_subtotal and not is_total_added:
+            rows.append(create_total_row())
+            is_total_added = True
+
+        cat_positions = wh_positions[wh]
+        positions = list(cat_positions.values())
+        wh_net, wh_neg = net[positions].sum(axis=0), neg[positions].sum(axis=0)
+        net_tot, neg_tot = int(tot_net[positions].sum()), int(tot_neg[positions].sum())
+
+        wh_row = {'name': wh, 'is_header': True, 'data': _month_cells(months, wh_net, wh_neg), 'categories': []}
+        wh_row['total'] = {'net': net_tot, 'neg': neg_tot}
+        if in_subtotal:
+            sub_net += wh_net
+            sub_neg += wh_neg
+            total_sub['net'] += net_tot
+            total_sub['neg'] += neg_tot
+
+        if has_comp:
+            comp_net, comp_neg = comp_wh.get((wh,), (0, 0))
+            wh_row['compare'] = {'net': comp_net, 'neg': comp_neg}
+            wh_row['pct_change'] = _pct_change(net_tot, comp_net)
+            if in_subtotal:
+                total_sub['compare']['net'] += comp_net
+                total_sub['compare']['neg'] += comp_neg
+
+        for cat in _ordered(cat_positions, CATEGORY_ORDER):
+            pos = cat_positions[cat]
+            cat_row = {'name': cat, 'data': _month_cells(months, net[pos], neg[pos]),
+                       'total': {'net': int(tot_net[pos]), 'neg': int(tot_neg[pos])}, 'parentId': wh}
+            if has_comp:
+                comp_net, comp_neg = comp_cat.get((wh, cat), (0, 0))
+                cat_row['compare'] = {'net': comp_net, 'neg': comp_neg}
+                cat_row['pct_change'] = _pct_change(cat_row['total']['net'], comp_net)
+            wh_row['categories'].append(cat_row)
+        rows.append(wh_row)
+
+    if not is_total_added: rows.append(create_total_row())
+    return rows
+
+
+def _row_vectors(row, months):
+    data = row['data']
+    net = np.array([data[m]['net'] if m in data else 0 for m in months], dtype=np.int64)
+    neg = np.array([data[m]['neg'] if m in data else 0 for m in months], dtype=np.int64)
+    return net, neg
+
+
+def _sum_rows(rows, months, name, has_comp, **extra):
+    """여러 행의 월별 값/합계/비교 합계를 더한 행"""
+    net = np.zeros(len(months), dtype=np.int64)
+    neg = np.zeros(len(months), dtype=np.int64)
+    compare = {'net': 0, 'neg': 0}
+    for row in rows:
+        row_net, row_neg = _row_vectors(row, months)
+        net += row_net
+        neg += row_neg
+        if has_comp:
+            compare['net'] += row.get('compare', {}).get('net', 0)
+            compare['neg'] += row.get('compare', {}).get('neg', 0)
+    total = {'net': int(net.sum()), 'neg': int(neg.sum())}
+    summed = {'name': name, **extra, 'data': _month_cells(months, net, neg), 'total': total}
+    if has_comp:
+        summed['compare'] = compare
+        # 합계 행과 같이 비교 값이 0이면 증감률을 넣지 않음
+        if compare['net'] != 0:
+            summed['pct_change'] = _pct_change(total['net'], compare['net'])
+    return summed
+
+
+def build_brand_rows(brand_results, brand_names):
+    """브랜드별 process_data 결과 {brand: (months, rows)} → 브랜드 → 창고 → 구분 트리와 통합 행 ('all' 화면).
+
+    브랜드 행의 categories에는 해당 브랜드의 창고 행과 합계 행이 들어가고(id/parentId만 브랜드 기준으로 바꾼 사본),
+    끝에 브랜드별 합계 행을 더한 통합 '합계'와 모든 창고를 더한 '총계' 행을 붙입니다.
+    """
+    months = sorted({m for brand_months, _ in brand_results.values() for m in brand_months}, reverse=True)
+    has_comp = any('compare' in row for _, rows in brand_results.values() for row in rows)
+
+    brand_rows, subtotals = [], []
+    for brand, (_, rows) in brand_results.items():
+        if not rows: continue
+        brand_id = f"brand_{brand}"
+        children = []
+        for row in rows:
+            if row.get('is_subtotal'):
+                subtotals.append(row)
+                children.append({**row, 'id': f"{brand}_subtotal", 'parentId': brand_id})
+                continue
+            wh_id = f"{brand}_{row['name']}"
+            children.append({**row, 'id': wh_id, 'parentId': brand_id,
+                             'categories': [{**cat, 'parentId': wh_id} for cat in row['categories']]})
+        warehouses = [row for row in rows if row.get('is_header')]
+        brand_row = _sum_rows(warehouses, months, brand_names.get(brand, brand), has_comp, id=brand_id, brand=brand, is_brand=True)
+        brand_row['categories'] = children
+        brand_rows.append(brand_row)
+
+    if not brand_rows: return [], []
+    combined = _sum_rows(subtotals, months, '합계', has_comp, is_subtotal=True)
+    grand = _sum_rows(brand_rows, months, '총계', has_comp, is_subtotal=True)
+    return months, brand_rows + [combined, grand]
+
+
+def _block_starts(keys):
+    """정렬된 키 리스트에서 값이 바뀌는 위치(연속 구간의 시작점) 목록"""
+    return [i for i in range(len(keys)) if i == 0 or keys[i] != keys[i - 1]]
+
+
+def _item_row(months, cat_name, series_name, item_name, net_row, neg_row, item_info):
+    stock, backorder = item_info.get(item_name, (0, 0))
+    return {
+        'name': item_name,
+        'id': f"item_{cat_name}_{series_name}_{item_name}",
+        'parentId': f"series_{cat_name}_{series_name}", 'level': 3,
+        'data': _month_cells(months, net_row, neg_row),
+        'total': {'net': int(net_row.sum()), 'neg': int(neg_row.sum())},
+        'stock': stock,
+        'backorder': backorder,
+    }
+
+
+def _category_series_tree(series_keys, s_net, s_neg, months, subtotal_targets, fill_series):
+    """(구분, 시리즈) 단위 행렬로 구분 → 시리즈 트리와 합계 행을 만듭니다.
+
+    series_keys는 (구분, 시리즈) 순으로 정렬되어 있어야 하며, fill_series(시리즈 위치, 시리즈 행)가 하위 내용을 채웁니다.
+    """
+    cat_starts = _block_starts([cat for cat, _ in series_keys])
+    if series_keys:
+        c_net, c_neg = np.add.reduceat(s_net, cat_starts, axis=0), np.add.reduceat(s_neg, cat_starts, axis=0)
+
+    cat_bounds = cat_starts + [len(series_keys)]
+    cat_blocks = {series_keys[start][0]: ci for ci, start in enumerate(cat_starts)}
+
+    all_categories = list(cat_blocks)
+    if not subtotal_targets: subtotal_targets = all_categories
+    ordered_categories = _ordered(all_categories, subtotal_targets)
+
+    sub_net = np.zeros(len(months), dtype=np.int64)
+    sub_neg = np.zeros(len(months), dtype=np.int64)
+    sub_total = {'net': 0, 'neg': 0}
+
+    def create_item_total_row():
+        data = _month_cells(months, sub_net, sub_neg)
+        data['total'] = sub_total
+        return {'name': '합계', 'id': 'subtotal_row', 'level': 0, 'data': data, 'total': sub_total}
+
+    rows = []
+    is_total_added = False
+    for cat_name in ordered_categories:
+        if cat_name not in subtotal_targets and not is_total_added:
+            rows.append(create_item_total_row())
+            is_total_added = True
+
+        ci = cat_blocks[cat_name]
+        cat_row = {'name': cat_name, 'id': f"cat_{cat_name}", 'level': 1,
+                   'data': _month_cells(months, c_net[ci], c_neg[ci]), 'children': []}
+        for si in range(cat_bounds[ci], cat_bounds[ci + 1]):
+            series_name = series_keys[si][1]
+            series_row = {'name': series_name, 'id': f"series_{cat_name}_{series_name}", 'parentId': cat_row['id'], 'level': 2,
+                          'data': _month_cells(months, s_net[si], s_neg[si]), 'children': []}
+            fill_series(si, series_row)
+            series_row['total'] = {'net': int(s_net[si].sum()), 'neg': int(s_neg[si].sum())}
+            cat_row['children'].append(series_row)
+        cat_row['total'] = {'net': int(c_net[ci].sum()), 'neg': int(c_neg[ci].sum())}
+
+        if cat_name in subtotal_targets:
+            sub_net += c_net[ci]
+            sub_neg += c_neg[ci]
+            sub_total['net'] += cat_row['total']['net']
+            sub_total['neg'] += cat_row['total']['neg']
+        rows.append(cat_row)
+
+    if not is_total_added: rows.append(create_item_total_row())
+    return rows
+
+
+def build_item_rows(agg, months, subtotal_targets, item_info):
+    """구분 → 시리즈 → 품목 트리와 합계 행을 만듭니다 (process_item_data 출력 형식).
+
+    agg: category, series, item_name, month_str, net, neg 컬럼
+    item_info: {item_name: (stock, backorder)}
+    """
+    index, net, neg = pivot_months(agg, ['category', 'series', 'item_name'], months)
+
+    # 피벗 결과는 (구분, 시리즈, 품목) 순으로 정렬되어 있으므로 시리즈는 연속 구간으로 합산
+    series_keys = [(cat, series) for cat, series, _ in index]
+    series_starts = _block_starts(series_keys)
+    series_bounds = series_starts + [len(index)]
+    s_net, s_neg = net, neg
+    if index:
+        s_net, s_neg = np.add.reduceat(net, series_starts, axis=0), np.add.reduceat(neg, series_starts, axis=0)
+
+    def fill_series(si, series_row):
+        for pos in range(series_bounds[si], series_bounds[si + 1]):
+            cat_name, series_name, item_name = index[pos]
+            series_row['children'].append(_item_row(months, cat_name, series_name, item_name, net[pos], neg[pos], item_info))
+
+    return _category_series_tree([series_keys[i] for i in series_starts], s_net, s_neg, months, subtotal_targets, fill_series)
+
+
+def build_series_rows(agg, months, subtotal_targets, item_counts):
+    """품목 없이 구분 → 시리즈 트리와 합계 행만 만듭니다 (단계별 품목 API).
+
+    시리즈 행에는 children 대신 item_count(품목 수)가 들어가고, 품목은 build_item_page로 따로 조회합니다.
+    """
+    index, s_net, s_neg = pivot_months(agg, ['category', 'series'], months)
+
+    def fill_series(si, series_row):
+        series_row['item_count'] = item_counts.get(index[si], 0)
+
+    return _category_series_tree(index, s_net, s_neg, months, subtotal_targets, fill_series)
+
+
+def build_item_list(agg, months, item_info):
+    """트리 없이 (구분, 시리즈, 품목) 순 품목 행 목록을 만듭니다 (품목 검색, 행마다 category/series 포함).
+
+    agg: category, series, item_name, month_str, net, neg 컬럼
+    """
+    index, net, neg = pivot_months(agg, ['category', 'series', 'item_name'], months)
+    rows = []
+    for pos, (cat_name, series_name, item_name) in enumerate(index):
+        row = _item_row(months, cat_name, series_name, item_name, net[pos], neg[pos], item_info)
+        row['category'], row['series'] = cat_name, series_name
+        rows.append(row)
+    return rows
+
+
+# 품목 페이지 정렬 기준
+ITEM_SORT_KEYS = ('name', 'net', 'stock', 'backorder')
+
+
+def build_item_page(agg, months, item_info, cat_name, series_name, sort='name', descending=False, offset=0, limit=None):
+    """한 시리즈의 품목 행을 정렬·페이지 단위로 만듭니다. 반환: (품목 행 목록, 전체 품목 수)
+
+    agg: 해당 시리즈의 item_name, month_str, net, neg 컬럼
+    """
+    index, net, neg = pivot_months(agg, ['item_name'], months)
+    names = [key[0] for key in index]
+    if sort == 'name':
+        order = np.arange(len(names))
+        if descending: order = order[::-1]
+    else:
+        if sort == 'net':
+            values = net.sum(axis=1)
+        else:
+            column = 0 if sort == 'stock' else 1
+            values = np.array([item_info.get(name, (0, 0))[column] for name in names], dtype=np.int64)
+        # 같은 값은 이름순 유지
+        order = np.argsort(-values if descending else values, kind='stable')
+    page = order[offset:offset + limit if limit is not None else None]
+    rows = [_item_row(months, cat_name, series_name, names[pos], net[pos], neg[pos], item_info) for pos in page]
+    return rows, len(names)
+
+
+def iter_item_pivot(agg, months, block_size=1000):
+    """품목 × 월 행렬을 품목 block_size개 단위로 나눠 차례로 만듭니다 (내보내기용, 트리를 만들지 않음).
+
+    반환: (구분, 시리즈, 품목, net 행, neg 행) 제너레이터 - 구분 → 시리즈 → 품목 순
+    """
+    if agg.empty: return
+    ordinal = agg.groupby(['category', 'series', 'item_name'], sort=True).ngroup().to_numpy()
+    for _, block in agg.groupby(ordinal // block_size, sort=True):
+        index, net, neg = pivot_months(block, ['category', 'series', 'item_name'], months)
+        for pos, (cat_name, series_name, item_name) in enumerate(index):
+            yield cat_name, series_name, item_name, net[pos], neg[pos]
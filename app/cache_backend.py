@@ -0,0 +1,124 @@
+# app/cache_backend.py
+# 메모리 예산(바이트)으로 관리하는 LRU 캐시 + 워커 공용 파일 캐시의 2단 캐시 백엔드
+# - 1단: 워커 프로세스 안의 LRU. 항목 크기는 2단에 저장된 pickle 길이로 재고, 합계가 예산을 넘으면 오래 안 쓴 항목부터 버립니다.
+# - 2단: 기존 FileSystemCache (모든 gunicorn 워커가 공유). 1단에서 빠진 항목은 여기서 다시 읽어 올립니다.
+# - 캐시 키에 데이터 세대 번호가 들어가 값이 바뀌지 않으므로, 워커마다 1단을 따로 두어도 결과가 어긋나지 않습니다.
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask_caching.backends.filesystemcache import FileSystemCache
+
+# 워커당 1단 캐시 기본 예산 (CACHE_MEMORY_BUDGET, 바이트)
+DEFAULT_MEMORY_BUDGET = 128 * 1024 * 1024
+
+
+class BudgetedCache(FileSystemCache):
+    """바이트 예산 LRU(워커 내) → FileSystemCache(워커 공용) 순서로 조회하는 캐시"""
+
+    def __init__(self, cache_dir, memory_budget=DEFAULT_MEMORY_BUDGET, **kwargs):
+        self.memory_budget = int(memory_budget)
+        self._entries = OrderedDict()  # key → (만료 시각, 값, 크기)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0, 'oversized': 0}
+        super().__init__(cache_dir, **kwargs)
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        args.insert(0, config['CACHE_DIR'])
+        kwargs.update(
+            threshold=config['CACHE_THRESHOLD'],
+            ignore_errors=config['CACHE_IGNORE_ERRORS'],
+            memory_budget=config.get('CACHE_MEMORY_BUDGET', DEFAULT_MEMORY_BUDGET),
+        )
+        return cls(*args, **kwargs)
+
+    # ---- 1단 (워커 내 LRU) ----
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None: self._bytes -= entry[2]
+
+    def _stored_size(self, key):
+        """[수정] 2단 파일에 기록된 pickle 길이 (객체 그래프를 순회하지 않음, 파일이 없으면 None)"""
+        try:
+            return os.path.getsize(self._get_filename(key)) - 4  # 앞 4바이트는 만료 시각
+        except OSError:
+            return None
+
+    def _remember(self, key, value, timeout):
+        size = self._stored_size(key)
+        if size is None: return
+        expires = 0 if not timeout else time.time() + timeout
+        with self._lock:
+            self._drop(key)
+            if size > self.memory_budget:
+                # 예산보다 큰 항목은 공용 파일 캐시에만 둠
+                self._stats['oversized'] += 1
+                return
+            self._entries[key] = (expires, value, size)
+            self._bytes += size
+            while self._bytes > self.memory_budget:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self._stats['evictions'] += 1
+
+    def _recall(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None: return None
+            if entry[0] and entry[0] < time.time():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    # ---- 캐시 인터페이스 ----
+    def get(self, key):
+        # 파일 개수 관리 항목은 워커 간에 계속 바뀌므로 항상 파일에서 읽음
+        if key == self._fs_count_file: return super().get(key)
+        value = self._recall(key)
+        if value is not None:
+            self._count('hits', 'memory_hits')
+            return value
+        value = super().get(key)
+        if value is None:
+            self._count('misses')
+            return None
+        self._count('hits', 'disk_hits')
+        # 파일에는 만료 시각만 있으므로 1단에는 기본 만료 시간으로 올림
+        self._remember(key, value, self.default_timeout)
+        return value
+
+    def set(self, key, value, timeout=None, mgmt_element=False):
+        stored = super().set(key, value, timeout, mgmt_element=mgmt_element)
+        if stored and not mgmt_element:
+            self._remember(key, value, self._timeout_seconds(timeout))
+        return stored
+
+    def delete(self, key, mgmt_element=False):
+        with self._lock: self._drop(key)
+        return super().delete(key, mgmt_element=mgmt_element)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        return super().clear()
+
+    def _timeout_seconds(self, timeout):
+        return self.default_timeout if timeout is None else timeout
+
+    def _count(self, *keys):
+        with self._lock:
+            for key in keys: self._stats[key] += 1
+
+    def stats(self):
+        """적중/실패/축출 횟수와 1단 캐시 사용량"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({'entries': len(self._entries), 'bytes': self._bytes, 'budget': self.memory_budget})
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else None
+        return stats
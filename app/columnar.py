@@ -0,0 +1,144 @@
+# app/columnar.py
+# 브랜드별 판매 데이터를 메모리에 컬럼 형태로 올려두고 SQL 없이 집계하는 엔진 (AGGREGATION_ENGINE=columnar)
+# - 창고/구분/시리즈/품목/월은 사전(dictionary) 인코딩한 정수 코드, 수량/재고/미입고는 int32로 보관
+# - 필터는 코드 단위 허용 여부 배열로 마스크를 만들고, 집계는 np.bincount / np.maximum.at으로 처리
+# - 데이터 세대 번호가 바뀌었을 때만 다시 적재합니다.
+import threading
+
+import numpy as np
+import pandas as pd
+
+from .db import pool
+from database_setup import sql_int, get_generation
+
+# 컬럼 → 코드 dtype (월은 int16 키)
+DIMENSIONS = {
+    'warehouse': np.int16,
+    'category': np.int16,
+    'series': np.int32,
+    'item_name': np.int32,
+    'month_year': np.int16,
+}
+
+
+class BrandColumns:
+    """한 브랜드의 sales_data를 사전 인코딩한 컬럼 묶음"""
+
+    def __init__(self, brand, generation, df):
+        self.brand = brand
+        self.generation = generation
+        self.codes, self.values = {}, {}
+        for col, dtype in DIMENSIONS.items():
+            codes, uniques = pd.factorize(df[col])  # NULL → -1
+            self.codes[col] = codes.astype(dtype)
+            # 마지막 자리에 None을 두어 코드 -1이 None으로 복원되도록 함
+            self.values[col] = np.append(np.asarray(uniques, dtype=object), None)
+        self.quantity = df['quantity'].to_numpy(dtype=np.int32)
+        self.stock = df['stock'].to_numpy(dtype=np.int32)
+        self.backorder = df['backorder'].to_numpy(dtype=np.int32)
+
+        # 월 코드별 정수 year/month (year가 없으면 -1)
+        n_months = len(self.values['month_year']) - 1
+        self.month_year_num = np.full(n_months, -1, dtype=np.int16)
+        self.month_num = np.full(n_months, -1, dtype=np.int16)
+        if n_months:
+            month_codes = self.codes['month_year']
+            _, first = np.unique(month_codes, return_index=True)
+            self.month_year_num[month_codes[first]] = df['year'].fillna(-1).to_numpy()[first]
+            self.month_num[month_codes[first]] = df['month'].fillna(-1).to_numpy()[first]
+
+    def __len__(self):
+        return len(self.quantity)
+
+    def nbytes(self):
+        """대략적인 메모리 사용량 (배열 + 사전 문자열)"""
+        total = self.quantity.nbytes + self.stock.nbytes + self.backorder.nbytes
+        total += self.month_year_num.nbytes + self.month_num.nbytes
+        for col in DIMENSIONS:
+            total += self.codes[col].nbytes + self.values[col].nbytes
+            total += sum(len(str(v).encode('utf-8')) + 49 for v in self.values[col][:-1])
+        return int(total)
+
+    def _allowed(self, col, selected):
+        allowed = np.isin(self.values[col][:-1], list(selected))
+        return np.append(allowed, False)[self.codes[col]]
+
+    def mask(self, criteria):
+        """필터 조건(criteria)에 맞는 행 마스크"""
+        month_ok = np.ones(len(self.month_num), dtype=bool)
+        if criteria['year'] is not None:
+            month_ok &= self.month_year_num == criteria['year']
+        if criteria['months'] is not None:
+            start, end = criteria['months']
+            month_ok &= (self.month_num >= start) & (self.month_num <= end)
+        mask = np.append(month_ok, False)[self.codes['month_year']]
+        if criteria['warehouses']: mask &= self._allowed('warehouse', criteria['warehouses'])
+        if criteria['categories']: mask &= self._allowed('category', criteria['categories'])
+        return mask
+
+    def aggregate(self, criteria, group_cols, with_stock=False):
+        """group_cols 단위 net/neg(+ 최대 stock/backorder) 집계 - SQL 엔진과 같은 형식의 DataFrame"""
+        idx = np.flatnonzero(self.mask(criteria))
+        if len(idx) == 0: return pd.DataFrame()
+
+        cols = ['month_year' if c == 'month_str' else c for c in group_cols]
+        # 코드들을 하나의 복합 키로 합침 (코드 +1: NULL(-1)도 별도 그룹으로 유지)
+        gid = np.zeros(len(idx), dtype=np.int64)
+        for col in cols:
+            gid = gid * len(self.values[col]) + (self.codes[col][idx].astype(np.int64) + 1)
+        keys, inverse = np.unique(gid, return_inverse=True)
+
+        qty = self.quantity[idx]
+        result = {}
+        rest = keys
+        for name, col in reversed(list(zip(group_cols, cols))):
+            size = len(self.values[col])
+            result[name] = self.values[col][rest % size - 1]
+            rest = rest // size
+        result = {name: result[name] for name in group_cols}
+        result['net'] = np.bincount(inverse, weights=qty, minlength=len(keys)).round().astype(np.int64)
+        result['neg'] = np.bincount(inverse, weights=np.minimum(qty, 0), minlength=len(keys)).round().astype(np.int64)
+        if with_stock:
+            for name, values in (('stock', self.stock), ('backorder', self.backorder)):
+                out = np.full(len(keys), np.iinfo(np.int32).min, dtype=np.int32)
+                np.maximum.at(out, inverse, values[idx])
+                result[name] = out.astype(np.int64)
+        return pd.DataFrame(result)
+
+
+class ColumnarStore:
+    """브랜드별 BrandColumns 캐시 (데이터 세대가 바뀌면 다시 적재)"""
+
+    def __init__(self):
+        self._brands = {}
+        self._lock = threading.Lock()
+
+    def _load(self, brand, generation):
+        query = (f"SELECT warehouse, category, series, item_name, month_year, year, month, "
+                 f"{sql_int('quantity')} AS quantity, {sql_int('stock')} AS stock, {sql_int('backorder')} AS backorder "
+                 f"FROM sales_data_{brand}")
+        with pool.connection() as conn:
+            df = pd.read_sql_query(query, conn)
+        return BrandColumns(brand, generation, df)
+
+    def get(self, brand):
+        with pool.connection() as conn:
+            generation = get_generation(conn)
+        columns = self._brands.get(brand)
+        if columns is None or columns.generation != generation:
+            with self._lock:
+                columns = self._brands.get(brand)
+                if columns is None or columns.generation != generation:
+                    columns = self._load(brand, generation)
+                    self._brands[brand] = columns
+        return columns
+
+    def aggregate(self, brand, criteria, group_cols, with_stock=False):
+        return self.get(brand).aggregate(criteria, group_cols, with_stock)
+
+    def memory_usage(self):
+        """브랜드별 {rows, bytes, generation}"""
+        return {brand: {'rows': len(c), 'bytes': c.nbytes(), 'generation': c.generation} for brand, c in self._brands.items()}
+
+
+store = ColumnarStore()
@@ -0,0 +1,70 @@
+# app/compact.py
+# 대시보드 API의 압축(columnar) 응답 형식 (?format=columnar)
+# - 월 목록은 한 번만, 행(node)은 이름/레벨/부모 인덱스의 병렬 배열로 보냅니다.
+# - net/neg는 (행 수 × 월 수) 크기의 평평한 정수 배열(행 우선)로 보냅니다.
+# - 브라우저에서는 common.js의 decodeColumnar()가 기존 rows 형식으로 복원합니다.
+
+
+def _flatten(rows, children_key):
+    """트리를 화면 표시 순서의 (row, 부모 인덱스) 목록으로 펼칩니다."""
+    flat = []
+
+    def visit(row, parent):
+        index = len(flat)
+        flat.append((row, parent))
+        for child in row.get(children_key) or []:
+            visit(child, index)
+
+    for row in rows:
+        visit(row, -1)
+    return flat
+
+
+def _matrix(flat, months, field):
+    values = []
+    for row, _ in flat:
+        data = row['data']
+        values.extend(data[m][field] if m in data else 0 for m in months)
+    return values
+
+
+def _encode(months, flat, level_of):
+    return {
+        'format': 'columnar',
+        'months': months,
+        'nodes': {
+            'name': [row['name'] for row, _ in flat],
+            'level': [level_of(row) for row, _ in flat],
+            'parent': [parent for _, parent in flat],
+        },
+        'net': _matrix(flat, months, 'net'),
+        'neg': _matrix(flat, months, 'neg'),
+        'total': {
+            'net': [row['total']['net'] for row, _ in flat],
+            'neg': [row['total']['neg'] for row, _ in flat],
+        },
+    }
+
+
+def encode_main(months, rows):
+    """process_data 결과 → 압축 형식 (level: 0 합계, 1 창고, 2 구분, 3 브랜드('all' 화면))"""
+    flat = _flatten(rows, 'categories')
+    payload = _encode(months, flat, lambda row: 0 if row.get('is_subtotal') else 3 if row.get('is_brand') else 1 if row.get('is_header') else 2)
+    has_compare = any('compare' in row for row, _ in flat)
+    if has_compare:
+        payload['compare'] = {
+            'net': [row.get('compare', {}).get('net', 0) for row, _ in flat],
+            'neg': [row.get('compare', {}).get('neg', 0) for row, _ in flat],
+        }
+        payload['pct_change'] = [row.get('pct_change') for row, _ in flat]
+    return payload
+
+
+def encode_items(months, rows, top_series):
+    """process_item_data 결과 → 압축 형식 (level: 0 합계, 1 구분, 2 시리즈, 3 품목)"""
+    flat = _flatten(rows, 'children')
+    payload = _encode(months, flat, lambda row: row['level'])
+    payload['stock'] = [row.get('stock', 0) for row, _ in flat]
+    payload['backorder'] = [row.get('backorder', 0) for row, _ in flat]
+    payload['top_series_data'] = top_series
+    return payload
@@ -0,0 +1,92 @@
+# app/db.py
+# 서비스 계층용 SQLite 연결 풀
+# - 스레드마다 조회 전용(query_only) 연결을 하나씩 열어 재사용하고, PRAGMA로 읽기 성능을 조정합니다.
+# - 적재 과정에서 DB 파일 자체가 교체되면(inode 변경) 다음 사용 시 연결을 새로 엽니다.
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from urllib.request import pathname2url
+
+from database_setup import DATABASE_NAME
+
+# 환경 변수로 조정 가능한 읽기용 PRAGMA 기본값
+SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE', -64 * 1024))  # 음수: KiB 단위 (64MB)
+SQLITE_TEMP_STORE = os.environ.get('SQLITE_TEMP_STORE', 'MEMORY')
+SQLITE_BUSY_TIMEOUT = float(os.environ.get('SQLITE_BUSY_TIMEOUT', 10))
+
+
+class ConnectionPool:
+    """스레드별 조회 전용 SQLite 연결을 재사용하는 풀"""
+
+    def __init__(self, path, mmap_size=SQLITE_MMAP_SIZE, cache_size=SQLITE_CACHE_SIZE,
+                 temp_store=SQLITE_TEMP_STORE, timeout=SQLITE_BUSY_TIMEOUT):
+        self.path = path
+        self.mmap_size = int(mmap_size)
+        self.cache_size = int(cache_size)
+        self.temp_store = temp_store
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stats = {'opens': 0, 'reuses': 0, 'reopens': 0, 'discards': 0, 'wait_seconds': 0.0}
+
+    def _file_id(self):
+        st = os.stat(self.path)
+        return st.st_dev, st.st_ino
+
+    def _open(self):
+        # mode=rw: 파일이 없을 때 빈 DB를 만들지 않고 오류를 냄
+        conn = sqlite3.connect(f"file:{pathname2url(self.path)}?mode=rw", uri=True, timeout=self.timeout)
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA mmap_size = {self.mmap_size}")
+        conn.execute(f"PRAGMA cache_size = {self.cache_size}")
+        conn.execute(f"PRAGMA temp_store = {self.temp_store}")
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    def _count(self, key, value=1):
+        with self._lock: self._stats[key] += value
+
+    def _discard(self):
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn is not None:
+            conn.close()
+            self._count('discards')
+
+    @contextmanager
+    def connection(self):
+        """현재 스레드의 연결을 빌려줍니다 (with 블록이 끝나도 닫지 않고 재사용)."""
+        start = time.perf_counter()
+        file_id = self._file_id()
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.file_id != file_id:
+            # 적재로 DB 파일이 교체됨 → 이전 파일을 보고 있는 연결은 버림
+            conn.close()
+            conn = None
+            self._count('reopens')
+        if conn is None:
+            conn = self._open()
+            self._local.conn, self._local.file_id = conn, file_id
+            self._count('opens')
+        else:
+            self._count('reuses')
+        self._count('wait_seconds', time.perf_counter() - start)
+
+        try:
+            yield conn
+        except sqlite3.DatabaseError:
+            # 손상/잠금 등 연결 상태를 알 수 없는 경우 다음 사용 시 새로 연결
+            self._discard()
+            raise
+
+    def stats(self):
+        with self._lock: stats = dict(self._stats)
+        stats['wait_ms'] = round(stats.pop('wait_seconds') * 1000, 3)
+        stats.update({'path': self.path, 'mmap_size': self.mmap_size, 'cache_size': self.cache_size, 'temp_store': self.temp_store})
+        return stats
+
+
+pool = ConnectionPool(DATABASE_NAME)
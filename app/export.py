@@ -0,0 +1,78 @@
+# app/export.py
+# [추가] 화면의 피벗 표를 CSV로 한 줄씩 내보내기 (스트리밍 응답용 제너레이터)
+# - 메인: process_data 결과(창고 × 구분, 비교년도 포함)를 펼쳐서 출력
+# - 품목: 캐시된 품목 × 월 집계를 품목 묶음 단위로 피벗해 바로 출력 (전체 트리를 만들지 않음)
+import csv
+import io
+
+# 이 행 수만큼 모아서 한 번에 내보냄
+CSV_CHUNK_ROWS = 500
+
+
+def _month_headers(months):
+    return [f"{m} {kind}" for m in months for kind in ('순판매', '반품')]
+
+
+def _month_values(months, data):
+    values = []
+    for m in months:
+        cell = data.get(m, {'net': 0, 'neg': 0})
+        values += [cell['net'], cell['neg']]
+    return values
+
+
+def main_csv_rows(months, rows, has_comp):
+    """메인 화면 트리 → [(브랜드), 창고, 구분, 합계 순판매, 합계 반품, (비교 순판매, 비교 반품, 증감률), 월별 ...] 행
+    브랜드 열은 전체 브랜드('all') 화면일 때만 붙습니다."""
+    has_brand = any(row.get('is_brand') for row in rows)
+    comp_headers = ['비교 순판매', '비교 반품', '증감률(%)'] if has_comp else []
+    yield [*(['브랜드'] if has_brand else []), '창고', '구분', '합계 순판매', '합계 반품', *comp_headers, *_month_headers(months)]
+
+    def line(brand, warehouse, category, row):
+        values = [brand] if has_brand else []
+        values += [warehouse, category, row['total']['net'], row['total']['neg']]
+        if has_comp:
+            compare = row.get('compare', {'net': 0, 'neg': 0})
+            pct = row.get('pct_change')
+            values += [compare['net'], compare['neg'], '' if pct is None else pct]
+        return values + _month_values(months, row['data'])
+
+    def walk(rows, brand):
+        for row in rows:
+            if row.get('is_brand'):
+                yield line(row['name'], '전체', '', row)
+                yield from walk(row['categories'], row['name'])
+            elif row.get('is_subtotal'):
+                yield line(brand, row['name'], '', row)
+            else:
+                yield line(brand, row['name'], '전체', row)
+                for cat_row in row['categories']:
+                    yield line(brand, row['name'], cat_row['name'], cat_row)
+
+    yield from walk(rows, '')
+
+
+def item_csv_rows(months, items, item_info):
+    """(구분, 시리즈, 품목, net 행, neg 행) → [구분, 시리즈, 품목, 재고, 미입고, 합계 순판매, 합계 반품, 월별 ...] 행"""
+    yield ['구분', '시리즈', '품목', '재고', '미입고', '합계 순판매', '합계 반품', *_month_headers(months)]
+    for cat_name, series_name, item_name, net_row, neg_row in items:
+        stock, backorder = item_info.get(item_name, (0, 0))
+        values = [cat_name, series_name, item_name, stock, backorder, int(net_row.sum()), int(neg_row.sum())]
+        for net, neg in zip(net_row.tolist(), neg_row.tolist()):
+            values += [net, neg]
+        yield values
+
+
+def stream_csv(rows):
+    """행 제너레이터 → UTF-8(BOM 포함, 엑셀 한글 호환) CSV 바이트 조각 제너레이터"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    yield '\ufeff'.encode('utf-8')
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % CSV_CHUNK_ROWS == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
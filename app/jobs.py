@@ -0,0 +1,111 @@
+# app/jobs.py
+# 데이터 업데이트(migrate_data.py)를 백그라운드 작업으로 실행하고 상태를 update_jobs 테이블에 기록합니다.
+# - 작업 상태가 DB에 있으므로 어느 gunicorn 워커에서든 조회할 수 있고, 동시에 두 개의 업데이트가 실행되지 않습니다.
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from database_setup import DATABASE_NAME
+from .warming import warm_caches
+
+MIGRATE_SCRIPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'migrate_data.py')
+# 진행 기록이 이 시간 이상 갱신되지 않은 작업은 중단된 것으로 간주
+JOB_STALE_SECONDS = int(os.environ.get('UPDATE_JOB_STALE_SECONDS', 1800))
+ACTIVE_STATUSES = ('queued', 'running')
+
+# 워커 프로세스당 한 번에 하나의 작업만 실행 (요청 스레드는 바로 반환)
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='update-job')
+
+
+def _connect():
+    conn = sqlite3.connect(DATABASE_NAME, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _set_status(job_id, status, message=None):
+    finished = status not in ACTIVE_STATUSES
+    conn = _connect()
+    try:
+        conn.execute(
+            f"UPDATE update_jobs SET status = ?, message = COALESCE(?, message), updated_at = CURRENT_TIMESTAMP"
+            f"{', finished_at = CURRENT_TIMESTAMP' if finished else ''} WHERE job_id = ?",
+            (status, message, job_id)
+        )
+    finally: conn.close()
+
+
+def _claim(brand):
+    """실행 중인 작업이 없으면 새 작업을 등록합니다. 반환: (새 job_id 또는 None, 실행 중인 job_id)"""
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(
+            "UPDATE update_jobs SET status = 'error', message = '작업이 응답 없이 중단되었습니다.', finished_at = CURRENT_TIMESTAMP "
+            f"WHERE status IN {ACTIVE_STATUSES} AND updated_at < datetime('now', ?)",
+            (f'-{JOB_STALE_SECONDS} seconds',)
+        )
+        active = conn.execute(f"SELECT job_id FROM update_jobs WHERE status IN {ACTIVE_STATUSES} LIMIT 1").fetchone()
+        if active:
+            conn.execute("ROLLBACK")
+            return None, active['job_id']
+
+        job_id = uuid.uuid4().hex
+        conn.execute("INSERT INTO update_jobs (job_id, brand, status) VALUES (?, ?, 'queued')", (job_id, brand))
+        conn.execute("COMMIT")
+        return job_id, None
+    except Exception:
+        if conn.in_transaction: conn.execute("ROLLBACK")
+        raise
+    finally: conn.close()
+
+
+def _run_job(job_id, brand, app=None):
+    _set_status(job_id, 'running')
+    try:
+        # 윈도우 환경 변수 설정 (한글 깨짐 방지)
+        env = os.environ.copy()
+        env["PYTHONIOENCODING"] = "utf-8"
+        result = subprocess.run(
+            [sys.executable, MIGRATE_SCRIPT_PATH, brand, '--job', job_id],
+            capture_output=True,
+            text=True,
+            check=False,
+            env=env,
+            encoding='utf-8'
+        )
+        if result.returncode != 0:
+            print(f"Update Error STDERR: {result.stderr}")
+            _set_status(job_id, 'error', result.stderr or result.stdout)
+        else:
+            print(f"--- [{brand}] 업데이트 성공 ---")
+            _set_status(job_id, 'success', result.stdout)
+            # [추가] 새 데이터 기준으로 기본 화면과 자주 쓰는 조회를 미리 계산
+            if app is not None:
+                print(f"--- 캐시 예열 완료: {warm_caches(app)} ---")
+    except Exception as e:
+        print(f"System Error: {str(e)}")
+        _set_status(job_id, 'error', str(e))
+
+
+def start_update_job(brand, app=None):
+    """업데이트 작업을 큐에 넣습니다. app을 넘기면 성공 후 캐시를 예열합니다.
+    반환: (새 job_id 또는 None, 이미 실행 중인 job_id)"""
+    job_id, active_id = _claim(brand)
+    if job_id: _executor.submit(_run_job, job_id, brand, app)
+    return job_id, active_id
+
+
+def get_job(job_id):
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT * FROM update_jobs WHERE job_id = ?", (job_id,)).fetchone()
+    finally: conn.close()
+    if row is None: return None
+    job = dict(row)
+    job['progress'] = json.loads(job['progress'] or '{}')
+    return job
@@ -0,0 +1,217 @@
+# app/metrics.py
+# 요청별 단계 시간 측정 (Server-Timing 헤더) · 워커별 히스토그램 (/api/metrics) · 느린 요청 샘플링 프로파일러
+# - 서비스/라우트 코드에서 with stage('sql'): ... 또는 note('rows', n)으로 기록하면 요청이 끝날 때 합산됩니다.
+# - 요청 밖(캐시 예열, 벤치마크)에서 호출하면 아무것도 하지 않습니다.
+# - 히스토그램은 워커 프로세스마다 따로 집계됩니다.
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+
+from . import PROJECT_ROOT
+
+# 히스토그램 구간 상한 (ms / 바이트)
+TIME_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# 느린 요청 프로파일러 (PROFILE_SLOW_MS를 지정해야 켜짐)
+PROFILE_SLOW_MS = float(os.environ.get('PROFILE_SLOW_MS', 0))
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 1.0))  # 프로파일링할 요청 비율
+PROFILE_INTERVAL = float(os.environ.get('PROFILE_INTERVAL_MS', 5)) / 1000
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(PROJECT_ROOT, 'profiles'))
+PROFILE_STACK_DEPTH = 40
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def add(self, value):
+        index = next((i for i, upper in enumerate(self.buckets) if value <= upper), len(self.buckets))
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """구간 상한으로 근사한 분위수"""
+        if not self.count: return None
+        target = q * self.count
+        seen = 0
+        for upper, n in zip(self.buckets + (None,), self.counts):
+            seen += n
+            if seen >= target: return upper
+        return None
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 3),
+            'p50': self.quantile(0.5),
+            'p90': self.quantile(0.9),
+            'p99': self.quantile(0.99),
+            'buckets': {('+Inf' if upper is None else str(upper)): n for upper, n in zip(self.buckets + (None,), self.counts)},
+        }
+
+
+class _Sampler:
+    """등록된 스레드들의 호출 스택을 주기적으로 모으는 샘플링 프로파일러 (필요할 때만 스레드 시작)"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._targets = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, thread_id):
+        with self._lock:
+            self._targets[thread_id] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='metrics-sampler', daemon=True)
+                self._thread.start()
+
+    def stop(self, thread_id):
+        with self._lock: return self._targets.pop(thread_id, Counter())
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock: targets = list(self._targets.items())
+            if not targets: continue
+            frames = sys._current_frames()
+            for thread_id, stacks in targets:
+                frame = frames.get(thread_id)
+                if frame is not None: stacks[_stack_key(frame)] += 1
+
+
+def _stack_key(frame):
+    stack = []
+    while frame is not None and len(stack) < PROFILE_STACK_DEPTH:
+        code = frame.f_code
+        stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    return ';'.join(reversed(stack))
+
+
+_lock = threading.Lock()
+_requests = {}  # endpoint → {'total': Histogram, 'stages': {stage: Histogram}, 'payload': Histogram, 'counters': Counter}
+_slow = deque(maxlen=20)
+_sampler = _Sampler(PROFILE_INTERVAL)
+
+
+@contextmanager
+def stage(name):
+    """요청 안에서 name 단계에 걸린 시간을 누적합니다."""
+    if not has_request_context():
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = g.setdefault('stage_ms', {})
+        timings[name] = timings.get(name, 0.0) + (time.perf_counter() - start) * 1000
+
+
+def note(key, value=1):
+    """요청 안에서 숫자 값을 누적합니다 (rows, cache_hit 등)."""
+    if not has_request_context(): return
+    counters = g.setdefault('notes', {})
+    counters[key] = counters.get(key, 0) + value
+
+
+def _before_request():
+    g.request_start = time.perf_counter()
+    g.profiling = PROFILE_SLOW_MS > 0 and random.random() < PROFILE_SAMPLE_RATE
+    if g.profiling: _sampler.start(threading.get_ident())
+
+
+def _after_request(response):
+    start = g.pop('request_start', None)
+    if start is None: return response
+    total_ms = (time.perf_counter() - start) * 1000
+    stage_ms = g.pop('stage_ms', {})
+    notes = g.pop('notes', {})
+    endpoint = request.endpoint or 'unknown'
+
+    parts = [f"{name};dur={ms:.2f}" for name, ms in stage_ms.items()]
+    parts.append(f"total;dur={total_ms:.2f}")
+    response.headers['Server-Timing'] = ', '.join(parts)
+
+    payload = response.calculate_content_length() if not response.is_streamed else None
+    with _lock:
+        entry = _requests.get(endpoint)
+        if entry is None:
+            entry = _requests[endpoint] = {'total': Histogram(TIME_BUCKETS_MS), 'stages': {}, 'payload': Histogram(SIZE_BUCKETS), 'counters': Counter()}
+        entry['total'].add(total_ms)
+        for name, ms in stage_ms.items():
+            entry['stages'].setdefault(name, Histogram(TIME_BUCKETS_MS)).add(ms)
+        if payload is not None: entry['payload'].add(payload)
+        entry['counters'].update(notes)
+        entry['counters'][f"status_{response.status_code}"] += 1
+
+    if g.pop('profiling', False):
+        stacks = _sampler.stop(threading.get_ident())
+        if total_ms >= PROFILE_SLOW_MS: _save_profile(endpoint, total_ms, stacks)
+    return response
+
+
+def _save_profile(endpoint, total_ms, stacks):
+    """느린 요청의 샘플 스택을 flamegraph용 folded 형식 파일로 저장합니다."""
+    path = None
+    if stacks:
+        try:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            path = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{endpoint.replace('.', '_')}-{int(total_ms)}ms.folded")
+            with open(path, 'w', encoding='utf-8') as f:
+                for stack, count in stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+        except OSError as e:
+            print(f"프로파일 저장 실패: {e}")
+            path = None
+    leaves = Counter()
+    for stack, count in stacks.items(): leaves[stack.rsplit(';', 1)[-1]] += count
+    with _lock:
+        _slow.append({
+            'endpoint': endpoint,
+            'path': request.full_path,
+            'ms': round(total_ms, 2),
+            'samples': sum(stacks.values()),
+            'top_frames': leaves.most_common(5),
+            'profile': path,
+        })
+
+
+def snapshot():
+    """엔드포인트별 히스토그램과 최근 느린 요청"""
+    with _lock:
+        return {
+            'requests': {
+                endpoint: {
+                    'total_ms': entry['total'].to_dict(),
+                    'stages_ms': {name: h.to_dict() for name, h in entry['stages'].items()},
+                    'payload_bytes': entry['payload'].to_dict(),
+                    'counters': dict(entry['counters']),
+                }
+                for endpoint, entry in _requests.items()
+            },
+            'slow_requests': list(_slow),
+        }
+
+
+def _teardown_request(exc):
+    # 예외로 after_request를 거치지 않은 요청의 샘플링 중지
+    if g.pop('profiling', False): _sampler.stop(threading.get_ident())
+
+
+def init_app(app):
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
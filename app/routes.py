@@ -1,16 +1,119 @@
 # app/routes.py
+import gzip
+import hashlib
 import os
-import sys
-import subprocess
-from flask import current_app, jsonify, request, render_template, session, redirect, url_for
-from .services import process_data, get_filter_options, process_item_data
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app, jsonify, request, render_template, session, redirect, url_for, stream_with_context
 from . import cache
+from .services import (process_data, get_filter_options, get_series_options, process_item_data, data_generation,
+                       process_item_series, process_item_children, process_item_export, preload_partials,
+                       search_items, get_all_filter_options, process_all_data, BRAND_NAMES, ALL_BRAND, ALL_BRAND_NAME)
+from .jobs import start_update_job, get_job
+from .compact import encode_main, encode_items
+from .export import main_csv_rows, item_csv_rows, stream_csv
+from .aggregation import ITEM_SORT_KEYS
+from .warming import record_view
+from .metrics import stage, note, snapshot
+from .db import pool
+from .columnar import store as columnar_store
+from .singleflight import stats as singleflight_stats
+
+# 이 크기(바이트) 이상인 응답만 gzip 압축본을 함께 보관
+JSON_GZIP_MIN_SIZE = int(os.environ.get('JSON_GZIP_MIN_SIZE', 1024))
+# [추가] 일괄 API: 한 요청에 담을 수 있는 화면 수와 동시 계산 스레드 수
+BATCH_MAX_VIEWS = int(os.environ.get('BATCH_MAX_VIEWS', 20))
+BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', 4))
+_batch_executor = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix='batch')
+# [추가] 품목 검색 결과 수 (기본 / 최대)
+SEARCH_LIMIT = 20
+SEARCH_LIMIT_MAX = 200
+# 품목 페이지 크기 (기본 / 최대)
+ITEM_PAGE_SIZE = 50
+ITEM_PAGE_MAX = 500
+
+def _json_etag(brand, kind, key):
+    # 데이터 세대 + 브랜드 + 종류 + 정규화된 필터 키
+    return hashlib.sha1(repr((data_generation(), brand, kind, key)).encode('utf-8')).hexdigest()
+
+def _json_bytes(etag, build):
+    """직렬화된 JSON 바이트(+gzip 압축본)를 캐시에서 찾거나 build()로 만들어 저장 → (raw, compressed)"""
+    cache_key = f"json_bytes:{etag}"
+    with stage('response_cache'):
+        cached = cache.get(cache_key)
+    note('response_cache_hit' if cached is not None else 'response_cache_miss')
+    if cached is None:
+        payload = build()
+        with stage('encode'):
+            raw = f"{current_app.json.dumps(payload)}\n".encode('utf-8')
+        with stage('gzip'):
+            compressed = gzip.compress(raw, compresslevel=6) if len(raw) >= JSON_GZIP_MIN_SIZE else None
+        cached = (raw, compressed)
+        cache.set(cache_key, cached)
+    return cached
+
+def _json_response(brand, kind, key, build):
+    """[추가] 직렬화된 JSON 바이트(+gzip 압축본)를 캐시하고 ETag로 조건부 응답
+    - ETag: 데이터 세대 + 브랜드 + 종류 + 정규화된 필터 키 → 같은 조회는 304로 본문 없이 응답
+    - build(): 캐시에 없을 때만 호출되어 응답 dict를 만듭니다."""
+    etag = _json_etag(brand, kind, key)
+    if request.if_none_match.contains_weak(etag):
+        note('not_modified')
+        response = current_app.response_class(status=304)
+    else:
+        raw, compressed = _json_bytes(etag, build)
+        if compressed is not None and 'gzip' in request.accept_encodings:
+            response = current_app.response_class(compressed, mimetype='application/json')
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = current_app.response_class(raw, mimetype='application/json')
+    # 압축 여부와 관계없이 같은 내용이므로 약한(weak) ETag 사용
+    response.set_etag(etag, weak=True)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def _view_payload(kind, brand, filters_tuple, fmt=None):
+    """화면 종류별 응답 dict (개별 API와 일괄 API 공통)"""
+    if kind == 'data':
+        # brand를 process_data에 전달 ([추가] 'all'은 브랜드별 결과를 합친 통합 화면)
+        months, rows = process_all_data(filters_tuple) if brand == ALL_BRAND else process_data(brand, filters_tuple)
+        # [추가] ?format=columnar: 월 목록 1회 + 병렬 배열/평평한 정수 행렬 형식
+        if fmt == 'columnar':
+            return encode_main(months, rows)
+        return {'months': months, 'rows': rows}
+    if kind == 'item':
+        months, rows, top_series = process_item_data(brand, filters_tuple)
+        if fmt == 'columnar':
+            return encode_items(months, rows, top_series)
+        return {'months': months, 'rows': rows, 'top_series_data': top_series}
+    if kind == 'item_series':
+        months, rows, top_series = process_item_series(brand, filters_tuple)
+        return {'months': months, 'rows': rows, 'top_series_data': top_series}
+    raise ValueError(kind)
+
+def _filters_payload(brand, selected_warehouses=(), selected_categories=()):
+    if brand == ALL_BRAND:
+        warehouses, categories, years, months = get_all_filter_options(selected_warehouses)
+    else:
+        warehouses, categories, years, months = get_filter_options(brand, selected_warehouses)
+    payload = {'warehouses': warehouses, 'categories': categories, 'years': years, 'months': months}
+    if selected_categories:
+        brands = BRAND_NAMES if brand == ALL_BRAND else [brand]
+        payload['series'] = sorted({s for b in brands for s in get_series_options(b, selected_categories)})
+    return payload
 
-# 브랜드별 표시 이름 매핑
-BRAND_NAMES = {
-    'nine': 'NINE ACCORD',
-    'curu': 'CURUNURU'
-}
+def prebuild_view(kind, brand, filters_tuple=None):
+    """[추가] 캐시 예열: 대시보드가 요청하는 것과 같은 ETag 키로 응답 JSON 바이트를 미리 만들어 둠
+    (메인 화면은 columnar 형식, 필터 목록은 선택 없음)"""
+    if kind == 'filters':
+        key, build = ((), ()), lambda: _filters_payload(brand)
+    elif kind == 'item_series':
+        key, build = filters_tuple, lambda: _view_payload(kind, brand, filters_tuple)
+    else:
+        fmt = 'columnar' if kind == 'data' else None
+        key, build = (filters_tuple, fmt), lambda: _view_payload(kind, brand, filters_tuple, fmt)
+    _json_bytes(_json_etag(brand, kind, key), build)
 
 @current_app.route('/')
 def home():
@@ -34,11 +137,12 @@ def login():
 @current_app.route('/<brand>/dashboard_main')
 def dashboard_main_view(brand):
     if not session.get('logged_in'): return redirect(url_for('login'))
-    if brand not in BRAND_NAMES: return "Invalid Brand", 404
+    # [추가] 'all': 전체 브랜드 통합 화면
+    if brand != ALL_BRAND and brand not in BRAND_NAMES: return "Invalid Brand", 404
     
     return render_template('dashboard_main.html', 
                            brand_code=brand, 
-                           brand_name=BRAND_NAMES[brand])
+                           brand_name=ALL_BRAND_NAME if brand == ALL_BRAND else BRAND_NAMES[brand])
 
 @current_app.route('/<brand>/dashboard_item')
 def dashboard_item_view(brand):
@@ -50,9 +154,11 @@ def dashboard_item_view(brand):
                            brand_name=BRAND_NAMES[brand])
 
 # API도 브랜드별로 구분
-@current_app.route('/api/<brand>/data')
-def api_data(brand):
-    if not session.get('logged_in'): return jsonify({'error': 'Auth required'}), 401
+# [추가] 없는 브랜드는 테이블 조회 전에 404 ('all'은 메인 화면/필터/내보내기만 지원)
+def _known_brand(brand, allow_all=False):
+    return brand in BRAND_NAMES or (allow_all and brand == ALL_BRAND)
+
+def _main_filters_tuple():
     filters = {
         'warehouses': request.args.getlist('warehouse'),
         'categories': request.args.getlist('category'),
@@ -61,13 +167,19 @@ def api_data(brand):
         'start_month': request.args.get('start_month'),
         'end_month': request.args.get('end_month'),
     }
-    # brand를 process_data에 전달
-    months, rows = process_data(brand, tuple(sorted(filters.items())))
-    return jsonify({'months': months, 'rows': rows})
+    return tuple(sorted(filters.items()))
 
-@current_app.route('/api/<brand>/data/item')
-def api_item_data(brand):
+@current_app.route('/api/<brand>/data')
+def api_data(brand):
     if not session.get('logged_in'): return jsonify({'error': 'Auth required'}), 401
+    if not _known_brand(brand, allow_all=True): return jsonify({'error': f"알 수 없는 브랜드 '{brand}'"}), 404
+    filters_tuple = _main_filters_tuple()
+    fmt = request.args.get('format')
+    record_view('data', brand, filters_tuple)
+
+    return _json_response(brand, 'data', (filters_tuple, fmt), lambda: _view_payload('data', brand, filters_tuple, fmt))
+
+def _item_filters_tuple():
     filters = {
         'warehouses': request.args.getlist('warehouse'),
         'categories': request.args.getlist('category'),
@@ -75,56 +187,238 @@ def api_item_data(brand):
         'start_month': request.args.get('start_month'),
         'end_month': request.args.get('end_month'),
     }
-    months, rows, top_series = process_item_data(brand, tuple(sorted(filters.items())))
-    return jsonify({'months': months, 'rows': rows, 'top_series_data': top_series})
+    return tuple(sorted(filters.items()))
+
+@current_app.route('/api/<brand>/data/item')
+def api_item_data(brand):
+    if not session.get('logged_in'): return jsonify({'error': 'Auth required'}), 401
+    if not _known_brand(brand): return jsonify({'error': f"알 수 없는 브랜드 '{brand}'"}), 404
+    filters_tuple = _item_filters_tuple()
+    fmt = request.args.get('format')
+    record_view('item', brand, filters_tuple)
+
+    return _json_response(brand, 'item', (filters_tuple, fmt), lambda: _view_payload('item', brand, filters_tuple, fmt))
+
+# [추가] 단계별 품목 API: 구분/시리즈 행만 먼저 받고, 품목은 시리즈를 펼칠 때 페이지 단위로 조회
+@current_app.route('/api/<brand>/data/item/series')
+def api_item_series(brand):
+    if not session.get('logged_in'): return jsonify({'error': 'Auth required'}), 401
+    if not _known_brand(brand): return jsonify({'error': f"알 수 없는 브랜드 '{brand}'"}), 404
+    filters_tuple = _item_filters_tuple()
+    record_view('item_series', brand, filters_tuple)
+
+    return _json_response(brand, 'item_series', filters_tuple, lambda: _view_payload('item_series', brand, filters_tuple))
+
+@current_app.route('/api/<brand>/data/item/children')
+def api_item_children(brand):
+    """?cat_name=&series_name=&sort=name|net|stock|backorder&order=asc|desc&offset=&limit= + 품목 화면 필터"""
+    if not session.get('logged_in'): return jsonify({'error': 'Auth required'}), 401
+    if not _known_brand(brand): return jsonify({'error': f"알 수 없는 브랜드 '{brand}'"}), 404
+    category, series = request.args.get('cat_name'), request.args.get('series_name')
+    sort = request.args.get('sort', 'name')
+    descending = request.args.get('order', 'asc') == 'desc'
+    offset = request.args.get('offset', 0, type=int)
+    limit = request.args.get('limit', ITEM_PAGE_SIZE, type=int)
+    if category is None or series is None: return jsonify({'error': 'cat_name and series_name are required'}), 400
+    if sort not in ITEM_SORT_KEYS: return jsonify({'error': f"sort must be one of {', '.join(ITEM_SORT_KEYS)}"}), 400
+    offset, limit = max(offset, 0), min(max(limit, 1), ITEM_PAGE_MAX)
+    filters_tuple = _item_filters_tuple()
+
+    def build():
+        rows, total = process_item_children(brand, filters_tuple, category, series, sort, descending, offset, limit)
+        return {'rows': rows, 'total': total, 'offset': offset, 'limit': limit}
+    return _json_response(brand, 'item_children', (filters_tuple, category, series, sort, descending, offset, limit), build)
+
+@current_app.route('/api/<brand>/items/search')
+def api_item_search(brand):
+    """[추가] ?q=검색어&limit= + 품목 화면 필터 → 품목명/시리즈에 검색어가 들어간 품목 행 (월별 값, 재고, 미입고)"""
+    if not session.get('logged_in'): return jsonify({'error': 'Auth required'}), 401
+    if not _known_brand(brand): return jsonify({'error': f"알 수 없는 브랜드 '{brand}'"}), 404
+    query = request.args.get('q', '').strip()
+    limit = min(max(request.args.get('limit', SEARCH_LIMIT, type=int), 1), SEARCH_LIMIT_MAX)
+    filters_tuple = _item_filters_tuple()
+
+    def build():
+        months, rows = search_items(brand, query, filters_tuple, limit)
+        return {'query': query, 'months': months, 'rows': rows}
+    return _json_response(brand, 'item_search', (filters_tuple, query, limit), build)
+
+# [추가] 화면과 같은 필터로 피벗 표를 CSV로 내려받기 (한 줄씩 스트리밍)
+def _csv_response(chunks, filename):
+    response = current_app.response_class(stream_with_context(chunks), mimetype='text/csv')
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers['Cache-Control'] = 'private, no-store'
+    return response
+
+def _export_filename(brand, kind, filters_tuple):
+    filters = dict(filters_tuple)
+    parts = [brand, kind, filters.get('main_year') or 'all']
+    if filters.get('comp_year'): parts.append(f"vs{filters['comp_year']}")
+    return '_'.join(parts) + '.csv'
+
+@current_app.route('/api/<brand>/export')
+def api_export(brand):
+    if not session.get('logged_in'): return jsonify({'error': 'Auth required'}), 401
+    if not _known_brand(brand, allow_all=True): return jsonify({'error': f"알 수 없는 브랜드 '{brand}'"}), 404
+    filters_tuple = _main_filters_tuple()
+    # 메인 화면 집계는 창고 × 구분 단위로 작으므로 캐시된 process_data 결과를 그대로 펼침
+    months, rows = process_all_data(filters_tuple) if brand == ALL_BRAND else process_data(brand, filters_tuple)
+    has_comp = any('compare' in row for row in rows)
+    return _csv_response(stream_csv(main_csv_rows(months, rows, has_comp)), _export_filename(brand, 'main', filters_tuple))
+
+@current_app.route('/api/<brand>/export/item')
+def api_export_item(brand):
+    if not session.get('logged_in'): return jsonify({'error': 'Auth required'}), 401
+    if not _known_brand(brand): return jsonify({'error': f"알 수 없는 브랜드 '{brand}'"}), 404
+    filters_tuple = _item_filters_tuple()
+    months, items, item_info = process_item_export(brand, filters_tuple)
+    return _csv_response(stream_csv(item_csv_rows(months, items, item_info)), _export_filename(brand, 'item', filters_tuple))
 
 @current_app.route('/api/<brand>/filters')
 def api_filters(brand):
     if not session.get('logged_in'): return jsonify({'error': 'Auth required'}), 401
-    warehouses, categories, years, months = get_filter_options(brand)
-    return jsonify({'warehouses': warehouses, 'categories': categories, 'years': years, 'months': months})
+    if not _known_brand(brand, allow_all=True): return jsonify({'error': f"알 수 없는 브랜드 '{brand}'"}), 404
+    # [추가] 연쇄 필터: ?warehouse=로 선택한 창고에 있는 구분만, ?category=를 주면 해당 구분의 시리즈 목록도 반환
+    selected_warehouses = tuple(request.args.getlist('warehouse'))
+    selected_categories = tuple(request.args.getlist('category'))
 
-# app/routes.py 의 trigger_update 함수 부분 수정
+    return _json_response(brand, 'filters', (selected_warehouses, selected_categories),
+                          lambda: _filters_payload(brand, selected_warehouses, selected_categories))
+
+def _batch_list(values, name):
+    """필터 값 중 목록 항목 (목록이 아니면 ValueError)"""
+    items = values.get(name) or []
+    if not isinstance(items, list): raise ValueError(f"filters.{name}는 목록이어야 합니다.")
+    return [str(item) for item in items]
+
+def _batch_view(entry):
+    """일괄 API 요청 항목 → (kind, brand, filters_tuple, 캐시 키, build) / 잘못된 항목은 ValueError"""
+    if not isinstance(entry, dict): raise ValueError('각 요청은 객체여야 합니다.')
+    kind, brand = entry.get('view'), entry.get('brand')
+    if not isinstance(brand, str) or not _known_brand(brand, allow_all=kind in ('filters', 'data')):
+        raise ValueError(f"알 수 없는 브랜드 '{brand}'")
+    values = entry.get('filters')
+    if values is None: values = {}
+    if not isinstance(values, dict): raise ValueError('filters는 객체여야 합니다.')
+    if kind == 'filters':
+        selected_warehouses, selected_categories = tuple(_batch_list(values, 'warehouses')), tuple(_batch_list(values, 'categories'))
+        return kind, brand, None, (selected_warehouses, selected_categories), lambda: _filters_payload(brand, selected_warehouses, selected_categories)
+    if kind not in ('data', 'item', 'item_series'): raise ValueError(f"알 수 없는 화면 '{kind}'")
+    # 개별 API가 화면에서 받는 것과 같은 형태 (빈 값은 빈 문자열)
+    filters = {
+        'warehouses': _batch_list(values, 'warehouses'),
+        'categories': _batch_list(values, 'categories'),
+        'main_year': str(values.get('main_year') or ''),
+        'start_month': str(values.get('start_month') or ''),
+        'end_month': str(values.get('end_month') or ''),
+    }
+    if kind == 'data': filters['comp_year'] = str(values.get('comp_year') or '')
+    filters_tuple = tuple(sorted(filters.items()))
+    fmt = entry.get('format') if kind != 'item_series' else None
+    key = filters_tuple if kind == 'item_series' else (filters_tuple, fmt)
+    return kind, brand, filters_tuple, key, lambda: _view_payload(kind, brand, filters_tuple, fmt)
+
+@current_app.route('/api/batch', methods=['POST'])
+def api_batch():
+    """[추가] 여러 화면 조회를 한 번에 처리
+    요청: {"requests": [{"brand": "nine", "view": "filters|data|item|item_series", "filters": {...}, "format": "columnar"}, ...]}
+    응답: {"results": [개별 API와 같은 응답 또는 {"error": ...}, ...]} (요청 순서대로)
+    - 브랜드별로 여러 화면이 쓸 월별 부분 집계를 먼저 한 번에 읽어 공유하고, 화면들은 스레드 풀에서 동시에 계산합니다.
+    - 응답 조각은 개별 API와 같은 JSON 바이트 캐시를 쓰므로 서로의 결과를 재사용합니다."""
+    if not session.get('logged_in'): return jsonify({'error': 'Auth required'}), 401
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict): return jsonify({'error': '요청 본문은 JSON 객체여야 합니다.'}), 400
+    entries = body.get('requests')
+    if not isinstance(entries, list) or not entries:
+        return jsonify({'error': 'requests 목록이 필요합니다.'}), 400
+    if len(entries) > BATCH_MAX_VIEWS:
+        return jsonify({'error': f"한 번에 최대 {BATCH_MAX_VIEWS}개까지 요청할 수 있습니다."}), 400
+
+    views = []
+    for entry in entries:
+        try: views.append(_batch_view(entry))
+        except ValueError as e: views.append(e)
+    for kind, brand, filters_tuple, _, _ in (v for v in views if not isinstance(v, ValueError)):
+        if kind != 'filters': record_view(kind, brand, filters_tuple)
+
+    app = current_app._get_current_object()
+
+    def in_app(fn, *args):
+        with app.app_context(): return fn(*args)
+
+    def render(view):
+        kind, brand, _, key, build = view
+        raw, _ = _json_bytes(_json_etag(brand, kind, key), build)
+        return raw.rstrip(b'\n')
+
+    with stage('preload'):
+        by_brand = {}
+        for view in views:
+            if not isinstance(view, ValueError) and view[0] != 'filters':
+                # 'all' 화면은 각 브랜드의 부분 집계를 씀
+                for brand in (BRAND_NAMES if view[1] == ALL_BRAND else [view[1]]):
+                    by_brand.setdefault(brand, []).append((view[0], view[2]))
+        preloads = [_batch_executor.submit(in_app, preload_partials, brand, brand_views) for brand, brand_views in by_brand.items()]
+        for future in preloads:
+            try: future.result()
+            except Exception as e: print(f"일괄 조회 부분 집계 로드 실패: {e}")
+
+    with stage('views'):
+        futures = [None if isinstance(view, ValueError) else _batch_executor.submit(in_app, render, view) for view in views]
+        parts = []
+        for view, future in zip(views, futures):
+            if future is None:
+                parts.append(current_app.json.dumps({'error': str(view)}).encode('utf-8'))
+                continue
+            try:
+                parts.append(future.result())
+            except Exception as e:
+                print(f"일괄 조회 실패 ({view[0]}/{view[1]}): {e}")
+                parts.append(current_app.json.dumps({'error': '데이터 처리 중 오류가 발생했습니다.'}).encode('utf-8'))
+    note('batch_views', len(views))
+    body = b'{"results": [' + b', '.join(parts) + b']}\n'
+    response = current_app.response_class(body, mimetype='application/json')
+    response.headers['Cache-Control'] = 'private, no-store'
+    return response
 
 @current_app.route('/api/<brand>/update-data')
 def trigger_update(brand):
     if not session.get('logged_in'):
         return jsonify({'status': 'error', 'message': '로그인이 필요합니다.'}), 401
+    if brand != 'all' and brand not in BRAND_NAMES:
+        return jsonify({'status': 'error', 'message': f"알 수 없는 브랜드 '{brand}'"}), 404
 
+    # [수정] migrate_data.py를 백그라운드 작업으로 실행하고 바로 job_id를 반환
+    # - 진행 상황은 /api/update-jobs/<job_id> 로 조회
     try:
-        # 1. 스크립트 경로 확인
-        migrate_script_path = os.path.join(current_app.root_path, '..', 'migrate_data.py')
-        
-        # 2. 윈도우 환경 변수 설정 (한글 깨짐 방지)
-        env = os.environ.copy()
-        env["PYTHONIOENCODING"] = "utf-8"
-
-        # 3. 프로세스 실행 (check=False로 설정하여 에러가 나도 파이썬이 멈추지 않게 함)
-        result = subprocess.run(
-            [sys.executable, migrate_script_path, brand],
-            capture_output=True,
-            text=True,
-            check=False,  # <-- 수정: 에러 발생 시에도 멈추지 않고 stderr를 캡처함
-            env=env,
-            encoding='utf-8' # <-- 수정: UTF-8 강제
-        )
-
-        # 4. 실행 결과 판단
-        if result.returncode != 0:
-            # 스크립트 실행 중 에러가 발생한 경우
-            print(f"Update Error STDERR: {result.stderr}") # 서버 터미널에 로그 출력
-            return jsonify({
-                'status': 'error', 
-                'message': '데이터 업데이트 스크립트 오류',
-                'details': result.stderr  # 웹 화면에 에러 내용을 그대로 보여줌
-            }), 500
-
-        # 성공 시 캐시 비우기
-        cache.clear()
-        print(f"--- [{brand}] 업데이트 성공 ---")
-        return jsonify({'status': 'success', 'message': result.stdout})
-
+        job_id, active_id = start_update_job(brand, current_app._get_current_object())
     except Exception as e:
-        # 시스템 레벨의 에러 (파일을 못찾거나 권한 문제 등)
+        # 시스템 레벨의 에러 (DB 잠금, 권한 문제 등)
         print(f"System Error: {str(e)}")
-        return jsonify({'status': 'error', 'message': str(e)}), 500
\ No newline at end of file
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+    if job_id is None:
+        return jsonify({'status': 'error', 'message': '이미 데이터 업데이트가 진행 중입니다.', 'job_id': active_id}), 409
+    return jsonify({'status': 'queued', 'job_id': job_id}), 202
+
+@current_app.route('/api/update-jobs/<job_id>')
+def update_job_status(job_id):
+    if not session.get('logged_in'):
+        return jsonify({'status': 'error', 'message': '로그인이 필요합니다.'}), 401
+    job = get_job(job_id)
+    if job is None: return jsonify({'status': 'error', 'message': '작업을 찾을 수 없습니다.'}), 404
+    return jsonify(job)
+
+@current_app.route('/api/metrics')
+def api_metrics():
+    """[추가] 이 워커의 요청 단계별 시간 히스토그램, 캐시/연결 풀 통계, 최근 느린 요청"""
+    if not session.get('logged_in'): return jsonify({'error': 'Auth required'}), 401
+    metrics = snapshot()
+    metrics.update({
+        'pid': os.getpid(),
+        'cache': cache.cache.stats() if hasattr(cache.cache, 'stats') else None,
+        'singleflight': singleflight_stats(),
+        'pool': pool.stats(),
+        'columnar': columnar_store.memory_usage(),
+    })
+    return jsonify(metrics)
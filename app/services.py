@@ -1,265 +1,398 @@
+import os
 import sqlite3
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 from flask import current_app
 from . import cache
-
-DB_PATH = 'sales.db'
-
-def _get_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-def _safe_int(x):
-    try: return int(float(x))
-    except: return 0
-
-@cache.memoize()
-def get_filter_options(brand):
-    table_name = f"sales_data_{brand}"
-    conn = _get_connection()
+from .aggregation import (build_main_rows, build_item_rows, build_series_rows, build_item_page, iter_item_pivot, build_item_list,
+                          build_brand_rows)
+from .columnar import store as columnar_store
+from .db import pool
+from .metrics import stage, note
+from .singleflight import single_flight
+from database_setup import (rollup_table_name, dimension_table_name, search_table_name, search_index_is_fts,
+                            get_generation, ROLLUP_KEYS, BRANDS)
+
+# 집계 엔진: 'sql'(롤업 테이블, 기본값) 또는 'columnar'(메모리 컬럼 저장소)
+AGGREGATION_ENGINE = os.environ.get('AGGREGATION_ENGINE', 'sql')
+
+def data_generation():
+    """현재 데이터 세대 번호 (적재가 데이터를 바꿀 때마다 증가)"""
+    with pool.connection() as conn:
+        return get_generation(conn)
+
+def _generation_name(fname):
+    """캐시 키 이름에 현재 데이터 세대 번호를 붙입니다 (적재 후 모든 워커에서 즉시 새 키 사용)."""
+    return f"{fname}@{data_generation()}"
+
+@single_flight
+@cache.memoize(make_name=_generation_name)
+def get_filter_options(brand, warehouses=()):
+    """[수정] 적재 시 갱신되는 창고×구분×월 차원 테이블에서 필터 목록을 조회합니다.
+    warehouses를 주면 구분 목록은 해당 창고에 있는 구분만 반환합니다."""
+    table_name = dimension_table_name('wc', brand)
+    cat_where, params = "WHERE category IS NOT NULL", []
+    if warehouses:
+        cat_where += f" AND warehouse IN ({', '.join('?' for _ in warehouses)})"
+        params = list(warehouses)
     try:
-        query = f"SELECT DISTINCT warehouse, category, month_year FROM {table_name}"
-        df = pd.read_sql_query(query, conn)
+        with pool.connection() as conn:
+            warehouse_list = [r[0] for r in conn.execute(f"SELECT DISTINCT warehouse FROM {table_name} WHERE warehouse IS NOT NULL ORDER BY warehouse")]
+            categories = [r[0] for r in conn.execute(f"SELECT DISTINCT category FROM {table_name} {cat_where} ORDER BY category", params)]
+            # 'YY/MM' 형식이 아닌 월(year/month 계산 불가)은 제외
+            valid = ("WHERE (month_year GLOB '[0-9][0-9]/[0-9]' OR month_year GLOB '[0-9][0-9]/[0-9][0-9]') "
+                     "AND month BETWEEN 1 AND 12")
+            years = [r[0] for r in conn.execute(f"SELECT DISTINCT year FROM {table_name} {valid} ORDER BY year DESC")]
+            months = [r[0] for r in conn.execute(f"SELECT DISTINCT month FROM {table_name} {valid} ORDER BY month")]
     except: return [], [], [], []
-    finally: conn.close()
-
-    if df.empty: return [], [], [], []
-
-    warehouses = sorted(df['warehouse'].dropna().unique())
-    categories = sorted(df['category'].dropna().unique())
-    df['month_dt'] = pd.to_datetime(df['month_year'], format='%y/%m', errors='coerce').dropna()
-    
-    if df.empty: return warehouses, categories, [], []
-    years = sorted(df['month_dt'].dt.year.unique(), reverse=True)
-    months = sorted(df['month_dt'].dt.month.unique())
-    return warehouses, categories, [str(y) for y in years], [str(m).zfill(2) for m in months]
-
-def _get_base_data(brand, filters, for_comp_year=False):
-    table_name = f"sales_data_{brand}"
-    # [수정] backorder 컬럼 추가
-    query_parts = [f"SELECT warehouse, category, series, item_name, month_year, quantity, stock, backorder FROM {table_name} WHERE 1=1"]
-    params = []
+    return warehouse_list, categories, [str(y) for y in years], [str(m).zfill(2) for m in months]
+
+@cache.memoize(make_name=_generation_name)
+def get_series_options(brand, categories=()):
+    """구분×시리즈×월 차원 테이블의 시리즈 목록 (categories를 주면 해당 구분의 시리즈만)"""
+    where, params = "WHERE series IS NOT NULL AND series != ''", []
+    if categories:
+        where += f" AND category IN ({', '.join('?' for _ in categories)})"
+        params = list(categories)
+    try:
+        with pool.connection() as conn:
+            return [r[0] for r in conn.execute(f"SELECT DISTINCT series FROM {dimension_table_name('series', brand)} {where} ORDER BY series", params)]
+    except: return []
 
+def _filter_criteria(filters, for_comp_year=False):
+    """요청 필터를 엔진 공통 조건으로 정규화 (year: 4자리 정수, months: (시작월, 종료월))"""
     year_key = 'comp_year' if for_comp_year else 'main_year'
+    year = None
     if filters.get(year_key):
         year_str = str(int(filters[year_key]))[-2:]
-        query_parts.append("AND substr(month_year, 1, 2) = ?")
-        params.append(year_str)
+        year = 2000 + int(year_str)
 
+    months = None
     if filters.get('start_month') and filters.get('end_month'):
-        query_parts.append("AND CAST(substr(month_year, 4, 2) AS INTEGER) BETWEEN ? AND ?")
-        params.append(int(filters['start_month']))
-        params.append(int(filters['end_month']))
+        months = (int(filters['start_month']), int(filters['end_month']))
+    return {'year': year, 'months': months, 'warehouses': filters.get('warehouses') or [], 'categories': filters.get('categories') or []}
+
+def _build_where(filters, for_comp_year=False):
+    criteria = _filter_criteria(filters, for_comp_year)
+    query_parts = ["WHERE 1=1"]
+    params = []
+
+    # [수정] 적재 시 계산된 정수 year/month 컬럼으로 필터링 (인덱스 사용 가능)
+    if criteria['year'] is not None:
+        query_parts.append("AND year = ?")
+        params.append(criteria['year'])
 
-    if filters.get('warehouses'):
-        placeholders = ', '.join('?' for _ in filters['warehouses'])
+    if criteria['months'] is not None:
+        query_parts.append("AND month BETWEEN ? AND ?")
+        params.extend(criteria['months'])
+
+    if criteria['warehouses']:
+        placeholders = ', '.join('?' for _ in criteria['warehouses'])
         query_parts.append(f"AND warehouse IN ({placeholders})")
-        params.extend(filters['warehouses'])
+        params.extend(criteria['warehouses'])
     
-    if filters.get('categories'):
-        placeholders = ', '.join('?' for _ in filters['categories'])
+    if criteria['categories']:
+        placeholders = ', '.join('?' for _ in criteria['categories'])
         query_parts.append(f"AND category IN ({placeholders})")
-        params.extend(filters['categories'])
+        params.extend(criteria['categories'])
+    return ' '.join(query_parts), params
 
-    conn = _get_connection()
+def _read_query(query, params):
     try:
-        df = pd.read_sql_query(' '.join(query_parts), conn, params=params)
-    except: df = pd.DataFrame()
-    conn.close()
-    
-    if not df.empty:
-        df['quantity'] = df['quantity'].apply(_safe_int)
-        df['stock'] = df['stock'].apply(_safe_int)
-        df['backorder'] = df['backorder'].apply(_safe_int) # [추가]
-        df['month_str'] = df['month_year']
+        with stage('sql'), pool.connection() as conn:
+            df = pd.read_sql_query(query, conn, params=params)
+    except: return pd.DataFrame()
+    note('sql_rows', len(df))
     return df
 
+def _get_agg_data(brand, filters, group_cols, rollup='wc', with_stock=False, for_comp_year=False):
+    """적재 시 만들어 둔 롤업 테이블의 월별 부분 집계를 합쳐 group_cols 단위 net/neg를 집계합니다.
+
+    group_cols의 'month_str'은 month_year 컬럼을 뜻합니다.
+    with_stock이면 그룹별 최대 stock/backorder도 함께 집계합니다.
+    AGGREGATION_ENGINE=columnar이면 SQL 대신 메모리 컬럼 저장소에서 같은 형식으로 집계합니다.
+    """
+    if AGGREGATION_ENGINE == 'columnar':
+        try:
+            with stage('columnar'):
+                return columnar_store.aggregate(brand, _filter_criteria(filters, for_comp_year), group_cols, with_stock)
+        except: return pd.DataFrame()
+
+    # [수정] 요청 범위의 월별 부분 집계(캐시)를 합쳐서 집계
+    criteria = _filter_criteria(filters, for_comp_year)
+    months = _select_months(brand, rollup, criteria)
+    if not months: return pd.DataFrame()
+    partials = _month_partials(brand, rollup, months)
+    if not partials: return pd.DataFrame()
+    with stage('groupby'):
+        df = pd.concat(partials, ignore_index=True)
+        if criteria['warehouses']: df = df[df['warehouse'].isin(criteria['warehouses'])]
+        if criteria['categories']: df = df[df['category'].isin(criteria['categories'])]
+        if df.empty: return pd.DataFrame()
+
+        aggs = {'net': 'sum', 'neg': 'sum'}
+        if with_stock: aggs.update(stock='max', backorder='max')
+        result = df.groupby(group_cols, sort=False, dropna=False).agg(aggs).reset_index()
+        # SQL 경로와 같이 비어있는 키는 None으로
+        result[group_cols] = result[group_cols].astype(object).where(result[group_cols].notna(), None)
+    note('agg_rows', len(result))
+    return result
+
+@cache.memoize(make_name=_generation_name)
+def _month_catalog(brand, rollup):
+    """롤업의 월 목록: [(month_year, year, month, 내용 키)]
+    내용 키는 적재 시 기록한 월별 해시(없으면 데이터 세대)로, 해시가 그대로인 월은 적재 후에도 같은 키를 씁니다."""
+    query = (f"SELECT r.month_year, r.year, r.month, h.content_hash FROM "
+             f"(SELECT DISTINCT month_year, year, month FROM {rollup_table_name(rollup, brand)}) r "
+             f"LEFT JOIN ingest_month_hashes h ON h.brand = ? AND h.month_year = r.month_year")
+    try:
+        with pool.connection() as conn:
+            generation = get_generation(conn)
+            rows = conn.execute(query, (brand,)).fetchall()
+    except sqlite3.Error: return []  # [수정] 롤업 테이블이 없는 브랜드는 빈 화면
+    return [(m, y, mo, h or f"g{generation}") for m, y, mo, h in rows]
+
+def _select_months(brand, rollup, criteria):
+    months = []
+    for month_year, year, month, content_key in _month_catalog(brand, rollup):
+        if criteria['year'] is not None and year != criteria['year']: continue
+        if criteria['months'] is not None and (month is None or not criteria['months'][0] <= month <= criteria['months'][1]): continue
+        months.append((month_year, content_key))
+    return months
+
+def _month_partials(brand, rollup, months):
+    """월별 부분 집계 DataFrame 목록 (롤업 키 단위 net/neg/stock/backorder + month_str)
+    캐시에 없는 월만 한 번의 쿼리로 읽어 월별로 나눠 저장합니다."""
+    keys = {month_year: f"partial:{rollup}:{brand}:{month_year}:{content_key}" for month_year, content_key in months}
+    with stage('partial_cache'):
+        partials = {month_year: cache.get(key) for month_year, key in keys.items()}
+    missing = [m for m, part in partials.items() if part is None]
+    note('partial_hit', len(partials) - len(missing))
+    note('partial_miss', len(missing))
+    if missing:
+        key_cols = [c for c in ROLLUP_KEYS[rollup] if c != 'month_year']
+        present = [m for m in missing if m is not None]
+        conditions = []
+        if present: conditions.append(f"month_year IN ({', '.join('?' for _ in present)})")
+        if len(present) < len(missing): conditions.append("month_year IS NULL")
+        query = (f"SELECT {', '.join(key_cols)}, month_year AS month_str, net, neg, stock, backorder "
+                 f"FROM {rollup_table_name(rollup, brand)} WHERE {' OR '.join(conditions)}")
+        loaded = _read_query(query, present)
+        if loaded.columns.empty: return []  # 조회 실패는 캐시하지 않음
+        groups = {(None if pd.isna(m) else m): positions for m, positions in loaded.groupby('month_str', dropna=False).indices.items()}
+        for month_year in missing:
+            part = loaded.iloc[groups.get(month_year, [])].reset_index(drop=True)
+            cache.set(keys[month_year], part)
+            partials[month_year] = part
+    return list(partials.values())
+
+# 브랜드별 표시 이름 매핑
+BRAND_NAMES = {
+    'nine': 'NINE ACCORD',
+    'curu': 'CURUNURU'
+}
+
+# [추가] 전체 브랜드 통합 화면 (메인 집계만)
+ALL_BRAND = 'all'
+ALL_BRAND_NAME = ' + '.join(BRAND_NAMES.values())
+
 BRAND_TARGETS = {
     'nine': {'warehouse': ["안경원", "면세", "수출", "온라인주문", "클립"], 'category': ["안경테", "선글라스", "클립"]},
     'curu': {'warehouse': ["안경원", "면세", "수출", "온라인주문"], 'category': ["안경테", "선글라스"]}
 }
 
-@cache.memoize()
+def preload_partials(brand, views):
+    """[추가] 여러 화면 (kind, filters_tuple)이 쓸 월별 부분 집계를 롤업별로 한 번의 조회로 미리 캐시에 채웁니다 (일괄 API).
+    이후 각 화면의 _get_agg_data는 캐시된 부분 집계만 합칩니다."""
+    if AGGREGATION_ENGINE == 'columnar': return
+    wanted = {}
+    for kind, filters_tuple in views:
+        filters = dict(filters_tuple)
+        rollup = 'wc' if kind == 'data' else 'item'
+        try:
+            criteria = [_filter_criteria(filters)]
+            if kind == 'data' and filters.get('comp_year') and filters.get('comp_year') != filters.get('main_year'):
+                criteria.append(_filter_criteria(filters, for_comp_year=True))
+        except ValueError: continue  # 잘못된 필터는 해당 화면 계산에서 오류로 처리
+        for c in criteria:
+            wanted.setdefault(rollup, {}).update(dict.fromkeys(_select_months(brand, rollup, c)))
+    for rollup, months in wanted.items():
+        if months: _month_partials(brand, rollup, list(months))
+
+@single_flight
+@cache.memoize(make_name=_generation_name)
 def process_data(brand, filters_tuple):
-    # ... (메인 집계 코드는 기존 로직과 동일하므로 생략하지 않고 핵심만 유지)
+    note('memo_miss')  # 캐시에 없을 때만 본문이 실행됨
+    # 집계는 SQLite에서 한 번만 수행하고, 트리 구성은 build_main_rows가 피벗 행렬로 처리
     filters = dict(filters_tuple)
-    df_main = _get_base_data(brand, filters)
-    if df_main.empty: return [], []
-
-    agg = df_main.groupby(['warehouse', 'category', 'month_str']).quantity.agg(net='sum', neg=lambda x: int(x[x<0].sum())).reset_index()
-    months = sorted(df_main['month_str'].unique(), reverse=True)
-    total_main = df_main.groupby(['warehouse', 'category']).quantity.agg(main_net='sum', main_neg=lambda x: int(x[x<0].sum())).reset_index()
+    agg = _get_agg_data(brand, filters, ['warehouse', 'category', 'month_str'])
+    if agg.empty: return [], []
+    months = sorted(agg['month_str'].unique(), reverse=True)
 
     comp_data = None
     if filters.get('comp_year') and filters.get('comp_year') != filters.get('main_year'):
-        df_comp = _get_base_data(brand, filters, for_comp_year=True)
-        if not df_comp.empty:
-            comp_data = df_comp.groupby(['warehouse', 'category']).quantity.agg(comp_net='sum', comp_neg=lambda x: int(x[x<0].sum())).reset_index()
+        comp = _get_agg_data(brand, filters, ['warehouse', 'category'], for_comp_year=True)
+        if not comp.empty:
+            comp_data = comp.rename(columns={'net': 'comp_net', 'neg': 'comp_neg'})
 
-    warehouses_all = agg['warehouse'].unique().tolist()
     target_config = BRAND_TARGETS.get(brand, {})
-    subtotal_targets = target_config.get('warehouse', [])
-    if not subtotal_targets: subtotal_targets = warehouses_all
-
-    others = sorted([w for w in warehouses_all if w not in subtotal_targets])
-    final_order = [w for w in subtotal_targets if w in warehouses_all] + others
-
-    subtotals = {m: {'net': 0, 'neg': 0} for m in months}
-    total_sub = {'net': 0, 'neg': 0}
-    if comp_data is not None: total_sub['compare'] = {'net': 0, 'neg': 0}
-        
-    rows = []
-    is_total_added = False
-
-    def create_total_row():
-        row = {'name': '합계', 'is_subtotal': True, 'data': subtotals, 'total': total_sub}
-        if comp_data is not None and 'compare' in total_sub:
-            row['compare'] = total_sub['compare']
-            if total_sub['compare']['net'] != 0:
-                row['pct_change'] = round((total_sub['net'] - total_sub['compare']['net']) / abs(total_sub['compare']['net']) * 100, 1)
-        return row
-
-    for wh in final_order:
-        tmp = agg[agg['warehouse'] == wh]
-        if tmp.empty: continue
-
-        if wh not in subtotal_targets and not is_total_added:
-            rows.append(create_total_row())
-            is_total_added = True
-
-        wh_row = {'name': wh, 'is_header': True, 'data': {}, 'categories': []}
-        for m in months:
-            grp = tmp[tmp['month_str'] == m]
-            net_val, neg_val = int(grp['net'].sum()), int(grp['neg'].sum())
-            wh_row['data'][m] = {'net': net_val, 'neg': neg_val}
-            if wh in subtotal_targets:
-                subtotals[m]['net'] += net_val
-                subtotals[m]['neg'] += neg_val
-
-        main_row = total_main[total_main['warehouse'] == wh]
-        net_tot, neg_tot = int(main_row['main_net'].sum()), int(main_row['main_neg'].sum())
-        wh_row['total'] = {'net': net_tot, 'neg': neg_tot}
-        
-        if wh in subtotal_targets:
-            total_sub['net'] += net_tot
-            total_sub['neg'] += neg_tot
-
-        if comp_data is not None:
-            cwh = comp_data[comp_data['warehouse'] == wh]
-            comp_net_sum, comp_neg_sum = int(cwh['comp_net'].sum()), int(cwh['comp_neg'].sum())
-            wh_row['compare'] = {'net': comp_net_sum, 'neg': comp_neg_sum}
-            wh_row['pct_change'] = round((net_tot - comp_net_sum) / abs(comp_net_sum) * 100, 1) if comp_net_sum != 0 else None
-            if wh in subtotal_targets:
-                total_sub['compare']['net'] += comp_net_sum
-                total_sub['compare']['neg'] += comp_neg_sum
-
-        all_categories_in_wh = tmp['category'].unique()
-        cat_desired_order = ["안경테", "선글라스", "클립", "모던"]
-        cat_ordered = [c for c in cat_desired_order if c in all_categories_in_wh]
-        cat_ordered += sorted([c for c in all_categories_in_wh if c not in cat_desired_order])
-        
-        for cat in cat_ordered:
-            group = tmp[tmp['category'] == cat]
-            cat_row = {'name': cat, 'data': {}, 'total': {}, 'parentId': wh}
-            for m in months:
-                gr2 = group[group['month_str'] == m]
-                cat_row['data'][m] = {'net': int(gr2['net'].sum()), 'neg': int(gr2['neg'].sum())}
-            
-            mc = total_main[(total_main['warehouse'] == wh) & (total_main['category'] == cat)]
-            cat_row['total'] = {'net': int(mc['main_net'].sum()), 'neg': int(mc['main_neg'].sum())}
-
-            if comp_data is not None:
-                c2 = comp_data[(comp_data['warehouse'] == wh) & (comp_data['category'] == cat)]
-                comp_c_net, comp_c_neg = int(c2['comp_net'].sum()), int(c2['comp_neg'].sum())
-                cat_row['compare'] = {'net': comp_c_net, 'neg': comp_c_neg}
-                cat_row['pct_change'] = round((cat_row['total']['net'] - comp_c_net) / abs(comp_c_net) * 100, 1) if comp_c_net != 0 else None
-            
-            wh_row['categories'].append(cat_row)
-        rows.append(wh_row)
-
-    if not is_total_added: rows.append(create_total_row())
+    with stage('tree'):
+        rows = build_main_rows(agg, months, target_config.get('warehouse', []), comp_data)
     return months, rows
 
-@cache.memoize()
-def process_item_data(brand, filters_tuple):
+@single_flight
+@cache.memoize(make_name=_generation_name)
+def _item_agg(brand, filters_tuple):
+    """[추가] 품목 화면 공통 집계 → (months, agg(시리즈 있는 행), item_info, top_series_data) / 데이터가 없으면 None"""
     filters = dict(filters_tuple)
-    df_main = _get_base_data(brand, filters)
-    if df_main.empty: return [], [], []
+    # [수정] stock과 backorder는 품목×월 단위 최대값까지 SQLite에서 집계
+    agg = _get_agg_data(brand, filters, ['category', 'series', 'item_name', 'month_str'], 'item', with_stock=True)
+    if agg.empty: return None
+    months = sorted(agg['month_str'].unique(), reverse=True)
+
+    with stage('item_info'):
+        info_agg = agg.groupby('item_name')[['stock', 'backorder']].max()
+        item_info = {name: (int(st), int(bo)) for name, st, bo in zip(info_agg.index, info_agg['stock'], info_agg['backorder'])}
+
+        # 시리즈가 비어있는 행은 월 목록과 재고 정보에만 반영 (트리/차트에서는 제외)
+        agg = agg[agg['series'].notna()]
+        series_sales = agg[agg['category'] != '케이스'].groupby('series')['net'].sum().nlargest(10)
+        top_series_data = [{'series': index, 'quantity': int(value)} for index, value in series_sales.items()]
+    return months, agg[['category', 'series', 'item_name', 'month_str', 'net', 'neg']], item_info, top_series_data
 
-    df_for_chart = df_main[df_main['category'] != '케이스']
-    series_sales = df_for_chart.groupby('series')['quantity'].sum().nlargest(10)
-    top_series_data = [{'series': index, 'quantity': int(value)} for index, value in series_sales.items()]
-    
-    months = sorted(df_main['month_str'].unique(), reverse=True)
-    agg = df_main.groupby(['category', 'series', 'item_name', 'month_str']).quantity.agg(net='sum', neg=lambda x: int(x[x<0].sum())).reset_index()
-    
-    # [수정] stock과 backorder 정보 집계
-    info_agg = df_main.groupby('item_name')[['stock', 'backorder']].max().reset_index()
-    
-    total_agg = agg.groupby(['category', 'series', 'item_name']).agg(total_net=('net', 'sum'), total_neg=('neg', 'sum')).reset_index()
-    total_agg = pd.merge(total_agg, info_agg, on='item_name', how='left').fillna(0)
-    total_agg['stock'] = total_agg['stock'].astype(int)
-    total_agg['backorder'] = total_agg['backorder'].astype(int)
 
-    rows = []
-    all_categories = agg['category'].unique()
+@single_flight
+@cache.memoize(make_name=_generation_name)
+def process_item_data(brand, filters_tuple):
+    note('memo_miss')
+    item_agg = _item_agg(brand, filters_tuple)
+    if item_agg is None: return [], [], []
+    months, agg, item_info, top_series_data = item_agg
+
     target_config = BRAND_TARGETS.get(brand, {})
-    subtotal_targets = target_config.get('category', [])
-    if not subtotal_targets: subtotal_targets = list(all_categories)
-
-    others = sorted([cat for cat in all_categories if cat not in subtotal_targets])
-    ordered_categories = [cat for cat in subtotal_targets if cat in all_categories] + others
-
-    subtotals = {m: {'net': 0, 'neg': 0} for m in months}
-    subtotals['total'] = {'net': 0, 'neg': 0}
-    is_total_added = False
-
-    def create_item_total_row():
-        return {'name': '합계', 'id': 'subtotal_row', 'level': 0, 'data': subtotals, 'total': subtotals['total']}
-
-    for cat_name in ordered_categories:
-        if cat_name not in subtotal_targets and not is_total_added:
-            rows.append(create_item_total_row())
-            is_total_added = True
-
-        cat_group = agg[agg['category'] == cat_name]
-        cat_row = {'name': cat_name, 'id': f"cat_{cat_name}", 'level': 1, 'data': {}, 'children': []}
-        
-        for series_name in sorted(cat_group['series'].unique()):
-            series_group = cat_group[cat_group['series'] == series_name]
-            series_total_info = total_agg[(total_agg['category'] == cat_name) & (total_agg['series'] == series_name)]
-            series_row = {'name': series_name, 'id': f"series_{cat_name}_{series_name}", 'parentId': cat_row['id'], 'level': 2, 'data': {}, 'children': []}
-            
-            for item_name in sorted(series_group['item_name'].unique()):
-                item_group = series_group[series_group['item_name'] == item_name].set_index('month_str')
-                item_total = series_total_info[series_total_info['item_name'] == item_name]
-                
-                item_row = {
-                    'name': item_name,
-                    'id': f"item_{cat_name}_{series_name}_{item_name}",
-                    'parentId': series_row['id'], 'level': 3, 'data': {},
-                    'total': {'net': int(item_total['total_net'].iloc[0]) if not item_total.empty else 0, 'neg': int(item_total['total_neg'].iloc[0]) if not item_total.empty else 0},
-                    'stock': int(item_total['stock'].iloc[0]) if not item_total.empty else 0,
-                    'backorder': int(item_total['backorder'].iloc[0]) if not item_total.empty else 0, # [추가]
-                }
-                item_row['data'] = {m: {'net': int(item_group.at[m, 'net']) if m in item_group.index else 0, 'neg': int(item_group.at[m, 'neg']) if m in item_group.index else 0} for m in months}
-                series_row['children'].append(item_row)
-
-            series_row['data'] = {m: {'net': sum(i['data'][m]['net'] for i in series_row['children']), 'neg': sum(i['data'][m]['neg'] for i in series_row['children'])} for m in months}
-            series_row['total'] = {'net': sum(i['total']['net'] for i in series_row['children']), 'neg': sum(i['total']['neg'] for i in series_row['children'])}
-            cat_row['children'].append(series_row)
-
-        cat_row['data'] = {m: {'net': sum(s['data'][m]['net'] for s in cat_row['children']), 'neg': sum(s['data'][m]['neg'] for s in cat_row['children'])} for m in months}
-        cat_row['total'] = {'net': sum(s['total']['net'] for s in cat_row['children']), 'neg': sum(s['total']['neg'] for s in cat_row['children'])}
-
-        if cat_name in subtotal_targets:
-            for m in months:
-                subtotals[m]['net'] += cat_row['data'][m]['net']
-                subtotals[m]['neg'] += cat_row['data'][m]['neg']
-            subtotals['total']['net'] += cat_row['total']['net']
-            subtotals['total']['neg'] += cat_row['total']['neg']
-        rows.append(cat_row)
-
-    if not is_total_added: rows.append(create_item_total_row())
-    return months, rows, top_series_data
\ No newline at end of file
+    with stage('tree'):
+        rows = build_item_rows(agg, months, target_config.get('category', []), item_info)
+    return months, rows, top_series_data
+
+
+@single_flight
+@cache.memoize(make_name=_generation_name)
+def process_item_series(brand, filters_tuple):
+    """[추가] 품목 화면 1단계: 구분 → 시리즈 행(품목 수 포함)과 상위 시리즈. 품목 행은 process_item_children으로 조회"""
+    note('memo_miss')
+    item_agg = _item_agg(brand, filters_tuple)
+    if item_agg is None: return [], [], []
+    months, agg, _, top_series_data = item_agg
+
+    target_config = BRAND_TARGETS.get(brand, {})
+    with stage('tree'):
+        items = agg[['category', 'series', 'item_name']].drop_duplicates()
+        item_counts = Counter(zip(items['category'], items['series']))
+        rows = build_series_rows(agg, months, target_config.get('category', []), item_counts)
+    return months, rows, top_series_data
+
+
+def process_item_children(brand, filters_tuple, category, series, sort='name', descending=False, offset=0, limit=None):
+    """[추가] 품목 화면 2단계: 펼친 시리즈 하나의 품목 행을 정렬·페이지 단위로 반환 → (rows, total)"""
+    item_agg = _item_agg(brand, filters_tuple)
+    if item_agg is None: return [], 0
+    months, agg, item_info, _ = item_agg
+
+    with stage('tree'):
+        subset = agg[(agg['category'] == category) & (agg['series'] == series)]
+        return build_item_page(subset, months, item_info, category, series, sort, descending, offset, limit)
+
+
+def process_item_export(brand, filters_tuple):
+    """[추가] 품목 내보내기용 → (months, (구분, 시리즈, 품목, net 행, neg 행) 제너레이터, item_info)
+    캐시된 품목 집계를 그대로 쓰고, 피벗은 제너레이터를 소비할 때 품목 묶음 단위로 수행"""
+    item_agg = _item_agg(brand, filters_tuple)
+    if item_agg is None: return [], iter(()), {}
+    months, agg, item_info, _ = item_agg
+    return months, iter_item_pivot(agg, months), item_info
+
+
+# [추가] 품목 검색: 색인에서 찾을 후보 품목 수 (필터 적용 전)
+SEARCH_CANDIDATES = 1000
+
+@cache.memoize(make_name=_generation_name)
+def _search_is_fts(brand):
+    try:
+        with pool.connection() as conn:
+            return search_index_is_fts(conn, brand)
+    except sqlite3.Error: return False  # [수정] 색인이 없으면 LIKE 검색 (_read_query가 빈 결과로 처리)
+
+
+def search_items(brand, query, filters_tuple, limit=20):
+    """[추가] 품목명/시리즈 부분 문자열 검색 → (months, 품목 행 목록)
+    검색 색인에서 후보 품목을 찾고, 그 품목들의 월별 값만 품목 롤업 테이블에서 읽습니다 (전체 트리를 만들지 않음).
+    품목명이 검색어로 시작하는 품목을 먼저, 그다음 이름순으로 정렬합니다."""
+    query = query.strip()
+    if not query: return [], []
+    filters = dict(filters_tuple)
+    escaped = query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    table = search_table_name(brand)
+    # trigram 색인은 3글자 이상일 때만 쓸 수 있으므로 짧은 검색어는 LIKE (품목 수만큼의 작은 테이블)
+    if len(query) >= 3 and _search_is_fts(brand):
+        where, params = f"{table} MATCH ?", ['"' + query.replace('"', '""') + '"']
+    else:
+        where, params = "(item_name LIKE ? ESCAPE '\\' OR series LIKE ? ESCAPE '\\')", [f"%{escaped}%"] * 2
+    if filters.get('categories'):
+        where += f" AND category IN ({', '.join('?' for _ in filters['categories'])})"
+        params += list(filters['categories'])
+    candidates = _read_query(
+        f"SELECT DISTINCT item_name FROM {table} WHERE {where} "
+        f"ORDER BY item_name LIKE ? ESCAPE '\\' DESC, item_name LIMIT ?",
+        params + [f"{escaped}%", SEARCH_CANDIDATES]
+    )
+    if candidates.empty: return [], []
+    names = candidates['item_name'].tolist()
+
+    rollup_where, rollup_params = _build_where(filters)
+    agg = _read_query(
+        f"SELECT category, series, item_name, month_year AS month_str, SUM(net) AS net, SUM(neg) AS neg, "
+        f"MAX(stock) AS stock, MAX(backorder) AS backorder FROM {rollup_table_name('item', brand)} "
+        f"{rollup_where} AND item_name IN ({', '.join('?' for _ in names)}) "
+        f"GROUP BY category, series, item_name, month_year",
+        rollup_params + names
+    )
+    if agg.empty: return [], []
+    months = sorted(agg['month_str'].dropna().unique(), reverse=True)
+    info_agg = agg.groupby('item_name')[['stock', 'backorder']].max().fillna(0)
+    item_info = {name: (int(st), int(bo)) for name, st, bo in zip(info_agg.index, info_agg['stock'], info_agg['backorder'])}
+
+    rank = {name: i for i, name in enumerate(names)}
+    with stage('tree'):
+        rows = build_item_list(agg, months, item_info)
+    rows.sort(key=lambda row: rank[row['name']])
+    return months, rows[:limit]
+
+
+_brand_executor = ThreadPoolExecutor(max_workers=len(BRANDS), thread_name_prefix='brands')
+
+def _per_brand(fn, *args):
+    """[추가] 브랜드마다 fn(brand, *args)를 스레드 풀에서 동시에 실행 → {brand: 결과} (BRANDS 순서)"""
+    app = current_app._get_current_object()
+
+    def run(brand):
+        with app.app_context(): return fn(brand, *args)
+    return dict(zip(BRANDS, _brand_executor.map(run, BRANDS)))
+
+
+def get_all_filter_options(warehouses=()):
+    """[추가] 전체 브랜드 화면의 필터 목록 (브랜드별 필터 목록의 합집합)"""
+    options = _per_brand(get_filter_options, warehouses).values()
+    warehouse_list, categories, years, months = (sorted({v for option in options for v in option[i]}) for i in range(4))
+    return warehouse_list, categories, years[::-1], months
+
+
+@single_flight
+@cache.memoize(make_name=_generation_name)
+def process_all_data(filters_tuple):
+    """[추가] 전체 브랜드 화면: 브랜드별 process_data 결과(각 브랜드의 캐시 항목)를 동시에 구해
+    브랜드 → 창고 → 구분 트리와 통합 합계/총계로 합칩니다. 원본 테이블을 다시 읽지 않습니다."""
+    note('memo_miss')
+    results = _per_brand(process_data, filters_tuple)
+    with stage('tree'):
+        return build_brand_rows(results, BRAND_NAMES)
@@ -0,0 +1,124 @@
+# app/singleflight.py
+# 같은 인자로 동시에 들어온 무거운 계산을 한 번만 수행하도록 묶는(single-flight) 데코레이터
+# - 같은 프로세스: 먼저 온 요청(리더)만 계산하고 나머지 스레드는 끝날 때까지 기다립니다.
+# - 다른 gunicorn 워커: 공용 잠금 디렉터리에 O_EXCL로 잠금 파일을 만들어 한 워커만 계산합니다.
+# - 기다린 요청은 다시 함수를 호출해 리더가 채워 둔 캐시(cache.memoize) 결과를 받습니다.
+# - [수정] 캐시에 이미 있는 결과는 잠금 없이 바로 반환합니다 (실제로 계산할 때만 묶음).
+import functools
+import hashlib
+import os
+import threading
+import time
+
+from . import cache, CACHE_DIR
+
+LOCK_DIR = os.environ.get('CACHE_LOCK_DIR', f"{CACHE_DIR}_locks")
+# 리더를 기다리는 최대 시간 / 이보다 오래된 잠금 파일은 중단된 것으로 간주 (초)
+SINGLEFLIGHT_TIMEOUT = float(os.environ.get('SINGLEFLIGHT_TIMEOUT', 60))
+POLL_INTERVAL = 0.05
+
+_lock = threading.Lock()
+_flights = {}  # key → threading.Event
+_stats = {'leaders': 0, 'coalesced_local': 0, 'coalesced_remote': 0, 'timeouts': 0}
+
+
+def _count(key):
+    with _lock: _stats[key] += 1
+
+
+def _lock_path(key):
+    return os.path.join(LOCK_DIR, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.lock')
+
+
+def _try_lock(path):
+    """잠금 파일을 만들면 True, 다른 프로세스가 계산 중이면 False"""
+    try:
+        os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        return True
+    except FileExistsError:
+        try:
+            if time.time() - os.path.getmtime(path) > SINGLEFLIGHT_TIMEOUT:
+                os.remove(path)  # 중단된 리더의 잠금 → 정리 후 다시 시도
+                return _try_lock(path)
+        except FileNotFoundError:
+            return _try_lock(path)
+        return False
+
+
+def _cached(fn, args, kwargs):
+    """cache.memoize가 이미 저장한 결과 → (찾았는지, 값)"""
+    make_cache_key = getattr(fn, 'make_cache_key', None)
+    if make_cache_key is None: return False, None
+    try:
+        value = cache.get(make_cache_key(fn.uncached, *args, **kwargs))
+    except Exception:
+        return False, None
+    return value is not None, value
+
+
+def _compute(fn, args, kwargs):
+    """잠금을 잡은 리더: 기다리는 동안 다른 워커가 채웠으면 그 결과, 아니면 직접 계산"""
+    found, value = _cached(fn, args, kwargs)
+    if found: return value
+    _count('leaders')
+    return fn(*args, **kwargs)
+
+
+def _wait_unlocked(path):
+    deadline = time.monotonic() + SINGLEFLIGHT_TIMEOUT
+    while os.path.exists(path):
+        if time.monotonic() > deadline:
+            _count('timeouts')
+            return
+        time.sleep(POLL_INTERVAL)
+
+
+def _run_exclusive(key, fn, args, kwargs):
+    """프로세스 간 잠금을 잡고 계산 (잡지 못하면 다른 워커의 계산을 기다린 뒤 호출)"""
+    try:
+        os.makedirs(LOCK_DIR, exist_ok=True)
+        path = _lock_path(key)
+        locked = _try_lock(path)
+    except OSError:
+        return fn(*args, **kwargs)  # 잠금 디렉터리를 쓸 수 없으면 그냥 계산
+    if not locked:
+        _count('coalesced_remote')
+        _wait_unlocked(path)
+        return fn(*args, **kwargs)
+    try:
+        return _compute(fn, args, kwargs)
+    finally:
+        try: os.remove(path)
+        except OSError: pass
+
+
+def single_flight(fn):
+    """같은 (함수, 인자) 호출을 동시에 한 번만 계산합니다. cache.memoize 바깥에 붙여 사용합니다."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        found, value = _cached(fn, args, kwargs)
+        if found: return value
+        key = f"{fn.__module__}.{fn.__qualname__}:{args!r}:{sorted(kwargs.items())!r}"
+        with _lock:
+            flight = _flights.get(key)
+            leader = flight is None
+            if leader: flight = _flights[key] = threading.Event()
+        if not leader:
+            _count('coalesced_local')
+            if not flight.wait(SINGLEFLIGHT_TIMEOUT): _count('timeouts')
+            return fn(*args, **kwargs)
+        try:
+            return _run_exclusive(key, fn, args, kwargs)
+        finally:
+            with _lock: _flights.pop(key, None)
+            flight.set()
+    return wrapper
+
+
+def stats():
+    """리더 계산 수(실제로 계산한 횟수)와 합쳐진(coalesced) 요청 수"""
+    with _lock:
+        stats = dict(_stats)
+        stats['in_flight'] = len(_flights)
+    stats['coalesced'] = stats['coalesced_local'] + stats['coalesced_remote']
+    return stats
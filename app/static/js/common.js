@@ -110,3 +110,70 @@ function handleError(message) {
     e.style.display = 'block';
   }
 }
+
+/**
+ * 압축(columnar) 응답(?format=columnar)을 기존 rows 트리 형식으로 복원합니다.
+ * - nodes: 이름/레벨/부모 인덱스 병렬 배열, net/neg: (행 수 × 월 수) 평평한 배열
+ * - 각 행의 id는 'n{인덱스}', 자식 행의 parentId는 부모의 id로 채웁니다.
+ * @param {object} resp - 서버 응답
+ * @param {string} childrenKey - 자식 행 배열의 키 ('categories' 또는 'children')
+ * @returns {{months: string[], rows: object[]}}
+ */
+function decodeColumnar(resp, childrenKey) {
+  const months = resp.months;
+  const width = months.length;
+  const { name, level, parent } = resp.nodes;
+
+  const nodes = name.map((n, i) => {
+    const data = {};
+    months.forEach((m, j) => {
+      data[m] = { net: resp.net[i * width + j], neg: resp.neg[i * width + j] };
+    });
+    const row = {
+      name: n,
+      id: `n${i}`,
+      level: level[i],
+      data,
+      total: { net: resp.total.net[i], neg: resp.total.neg[i] },
+    };
+    if (resp.compare) {
+      row.compare = { net: resp.compare.net[i], neg: resp.compare.neg[i] };
+      row.pct_change = resp.pct_change[i];
+    }
+    if (resp.stock) {
+      row.stock = resp.stock[i];
+      row.backorder = resp.backorder[i];
+    }
+    return row;
+  });
+
+  const rows = [];
+  nodes.forEach((row, i) => {
+    const p = parent[i];
+    if (p < 0) {
+      rows.push(row);
+      return;
+    }
+    row.parentId = nodes[p].id;
+    (nodes[p][childrenKey] = nodes[p][childrenKey] || []).push(row);
+  });
+  return { months, rows };
+}
+
+/**
+ * [추가] 여러 화면 조회를 일괄 API 한 번으로 요청합니다.
+ * requests: [{ brand, view: 'filters' | 'data' | 'item' | 'item_series', filters, format }]
+ * 반환: 요청 순서대로의 응답 배열 (실패한 항목은 { error })
+ */
+function fetchBatch(requests) {
+  return fetch('/api/batch', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ requests }),
+  })
+    .then((res) => {
+      if (!res.ok) throw new Error(`HTTP error! status: ${res.status}`);
+      return res.json();
+    })
+    .then((resp) => resp.results);
+}
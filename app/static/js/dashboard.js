@@ -13,10 +13,14 @@ document.addEventListener('DOMContentLoaded', () => {
 });
 
 function initFilters() {
-  // [중요] URL에 currentBrand 적용 (데이터 조회는 현재 브랜드만)
-  fetch(`/api/${currentBrand}/filters`)
-    .then((res) => res.json())
-    .then((data) => {
+  showLoading('mainReportTable');
+  // [수정] 필터 목록과 첫 화면(필터 없음) 데이터를 일괄 API 한 번으로 받음
+  fetchBatch([
+    { brand: currentBrand, view: 'filters' },
+    { brand: currentBrand, view: 'data', filters: {}, format: 'columnar' },
+  ])
+    .then(([data, first]) => {
+      if (data.error) throw new Error(data.error);
       allWarehouses = data.warehouses;
       allCategories = data.categories;
       allYears = data.years;
@@ -30,7 +34,7 @@ function initFilters() {
       populateSelect('end-month', allMonths, '종료월');
 
       addEventListenersToFilters();
-      fetchAndRender();
+      renderData(first);
     })
     .catch((err) => handleError(err, 'mainReportTable'));
 }
@@ -43,6 +47,10 @@ function addEventListenersToFilters() {
   document.getElementById('reset-filters').addEventListener('click', () => {
     window.location.reload();
   });
+  // [추가] 현재 필터 그대로 CSV 내려받기
+  document.getElementById('export-csv').addEventListener('click', () => {
+    window.location.href = `/api/${currentBrand}/export?${buildQueryString()}`;
+  });
 
   const nineTrigger = document.getElementById('nine-trigger');
   if (nineTrigger) {
@@ -59,30 +67,23 @@ function addEventListenersToFilters() {
       showLoading('mainReportTable');
       handleError('');
 
-      // [수정] 무조건 'all'로 호출하여 전체 업데이트 실행
+      // [수정] 무조건 'all'로 호출하여 전체 업데이트 실행 (백그라운드 작업)
       const updateUrl = `/api/all/update-data`;
 
       fetch(updateUrl)
-        .then((response) => {
-          if (!response.ok) {
-            return response.json().then((errorData) => {
+        .then((response) =>
+          response.json().then((data) => {
+            // 409: 이미 진행 중인 작업이 있으면 그 작업의 진행 상황을 이어서 표시
+            if (response.status === 409 && data.job_id) return data;
+            if (!response.ok) {
               throw new Error(
-                errorData.message || `HTTP error! Status: ${response.status}`
+                data.message || `HTTP error! Status: ${response.status}`
               );
-            });
-          }
-          return response.json();
-        })
-        .then((data) => {
-          if (data.status === 'success') {
-            alert(
-              '모든 데이터 업데이트가 완료되었습니다.\n페이지를 새로고침합니다.'
-            );
-            window.location.reload();
-          } else {
-            handleError(`업데이트 실패: ${data.message}`);
-          }
-        })
+            }
+            return data;
+          })
+        )
+        .then((data) => pollUpdateJob(data.job_id))
         .catch((error) => {
           handleError(`오류 발생: ${error.message}`);
         });
@@ -90,26 +91,94 @@ function addEventListenersToFilters() {
   }
 }
 
+const UPDATE_STAGE_LABELS = {
+  fetching: '구글 시트 다운로드 중',
+  cleaning: '데이터 정제 중',
+  writing: 'DB 저장 중',
+  done: '완료',
+  error: '실패',
+};
+
+/**
+ * 데이터 업데이트 작업의 진행 상황을 주기적으로 조회하여 표시합니다.
+ * @param {string} jobId - /api/<brand>/update-data 가 반환한 작업 ID
+ */
+function pollUpdateJob(jobId) {
+  fetch(`/api/update-jobs/${jobId}`)
+    .then((res) => {
+      if (!res.ok) throw new Error(`HTTP error! status: ${res.status}`);
+      return res.json();
+    })
+    .then((job) => {
+      if (job.status === 'success') {
+        alert(
+          '모든 데이터 업데이트가 완료되었습니다.\n페이지를 새로고침합니다.'
+        );
+        window.location.reload();
+        return;
+      }
+      if (job.status === 'error') {
+        handleError(`업데이트 실패: ${job.message || ''}`);
+        return;
+      }
+
+      const progress = Object.entries(job.progress || {})
+        .map(([brand, p]) => {
+          const label = UPDATE_STAGE_LABELS[p.stage] || p.stage;
+          const rows = p.rows != null ? ` (${p.rows.toLocaleString()}행)` : '';
+          return `[${brand.toUpperCase()}] ${label}${rows}`;
+        })
+        .join(' / ');
+      const loading = document.getElementById('mainLoading');
+      loading.textContent = `데이터 업데이트 중... ${progress || '대기 중'}`;
+      loading.style.display = 'block';
+      setTimeout(() => pollUpdateJob(jobId), 2000);
+    })
+    .catch((error) => {
+      handleError(`오류 발생: ${error.message}`);
+    });
+}
+
 function fetchAndRender() {
   showLoading('mainReportTable');
   const qs = buildQueryString();
   // [중요] URL에 currentBrand 적용
-  fetch(`/api/${currentBrand}/data?${qs}`)
+  // [수정] 압축(columnar) 형식으로 받아 기존 rows 형식으로 복원
+  fetch(`/api/${currentBrand}/data?${qs}&format=columnar`)
     .then((res) => {
       if (!res.ok) throw new Error(`HTTP error! status: ${res.status}`);
       return res.json();
     })
-    .then((resp) => {
-      if (resp.error) return handleError(resp.error, 'mainReportTable');
-      buildTable(resp.months, resp.rows);
-      renderChart(resp.months, resp.rows);
-      showTable('mainReportTable');
-    })
+    .then(renderData)
     .catch((err) =>
       handleError('데이터 로드 중 오류: ' + err.message, 'mainReportTable')
     );
 }
 
+function renderData(resp) {
+  if (resp.error) return handleError(resp.error, 'mainReportTable');
+  const { months, rows } = decodeMainRows(resp);
+  buildTable(months, rows);
+  renderChart(months, rows);
+  showTable('mainReportTable');
+}
+
+/**
+ * 압축 응답을 메인 집계 행 형식(창고 → 구분, 합계)으로 복원합니다.
+ * (level: 0 합계, 1 창고, 2 구분, 3 브랜드 - 전체 브랜드 화면)
+ */
+function decodeMainRows(resp) {
+  const { months, rows } = decodeColumnar(resp, 'categories');
+  const mark = (row) => {
+    if (row.level === 0) row.is_subtotal = true;
+    else if (row.level === 1) row.is_header = true;
+    else if (row.level === 3) row.is_brand = true;
+    (row.categories || []).forEach(mark);
+  };
+  rows.forEach(mark);
+  return { months, rows };
+}
+
 function buildQueryString() {
   const params = new URLSearchParams();
   const getCheckedValues = (selector) =>
@@ -165,18 +234,28 @@ function buildRow(row, months, hasCompare) {
   let html = '';
   const isWarehouse = row.is_header;
   const isSubtotal = row.is_subtotal;
+  // 압축 응답은 행마다 고유 id가 있음 (없으면 창고 이름)
+  const groupId = row.id || row.name;
   let rowClass = '';
   let attrs = '';
 
-  if (isWarehouse) {
+  if (row.is_brand) {
+    rowClass = 'brand-row collapsible-header';
+    attrs = `data-group-id="${groupId}"`;
+  } else if (isWarehouse) {
     rowClass = 'warehouse-row collapsible-header';
-    attrs = `data-group-id="${row.name}"`;
+    attrs = `data-group-id="${groupId}"`;
   } else if (isSubtotal) {
     rowClass = 'subtotal-row';
   } else {
     rowClass = 'category-row';
     attrs = `data-parent-id="${row.parentId}"`;
   }
+  // [추가] 전체 브랜드 화면: 브랜드 아래의 창고/합계 행은 브랜드를 펼쳐야 표시
+  if (row.parentId && (isWarehouse || isSubtotal)) {
+    rowClass += ' nested-row';
+    attrs += ` data-parent-id="${row.parentId}"`;
+  }
 
   html += `<tr class="${rowClass}" ${attrs}><td>${row.name}</td>`;
 
@@ -228,7 +307,7 @@ function renderChart(months, rows) {
   let otherColorIndex = 0;
 
   const datasets = rows
-    .filter((r) => r.is_header && r.name !== '케이스')
+    .filter((r) => (r.is_header || r.is_brand) && r.name !== '케이스')
     .map((wh) => {
       let color =
         colorMap[wh.name] ||
@@ -1,24 +1,36 @@
 // app/static/js/dashboard_item.js
 
 let pieChartInstance = null;
+// [추가] 단계별 로딩 상태: 시리즈 행만 먼저 받고 품목은 펼칠 때 페이지 단위로 조회
+const ITEM_PAGE_SIZE = 50;
+const SEARCH_LIMIT = 100;
+let currentMonths = [];
+let currentQs = '';
+let searchTimer = null;
 
 document.addEventListener('DOMContentLoaded', () => {
   // 접기/펼치기 기능 활성화 (이벤트 위임 방식이므로 한 번만 호출하면 됨)
   initCollapse('itemTableBody');
+  initLazyItems('itemTableBody');
   initFilters();
 });
 
 function initFilters() {
-  fetch(`/api/${currentBrand}/filters`)
-    .then((res) => res.json())
-    .then((data) => {
+  showLoading('itemReportTable');
+  // [수정] 필터 목록과 첫 화면(필터 없음)의 시리즈 행을 일괄 API 한 번으로 받음
+  fetchBatch([
+    { brand: currentBrand, view: 'filters' },
+    { brand: currentBrand, view: 'item_series', filters: {} },
+  ])
+    .then(([data, first]) => {
+      if (data.error) throw new Error(data.error);
       populateSlicer('warehouse-filter', ['전체', ...data.warehouses], true);
       populateSlicer('category-filter', ['전체', ...data.categories], true);
       populateSelect('main-year', data.years, '집계년도 선택');
       populateSelect('start-month', data.months, '시작월');
       populateSelect('end-month', data.months, '종료월');
       addEventListenersToFilters();
-      fetchAndRender();
+      renderSeries(buildQueryString(), first);
     })
     .catch((err) => handleError(err, 'itemReportTable'));
 }
@@ -30,6 +42,12 @@ function addEventListenersToFilters() {
   document.getElementById('reset-filters').addEventListener('click', () => {
     window.location.reload();
   });
+  // [추가] 현재 필터 그대로 CSV 내려받기
+  document.getElementById('export-csv').addEventListener('click', () => {
+    window.location.href = `/api/${currentBrand}/export/item?${buildQueryString()}`;
+  });
+  // 정렬이 바뀌면 펼친 품목을 새 기준으로 다시 받음
+  document.getElementById('item-sort').addEventListener('change', fetchAndRender);
 
   // 검색 버튼 및 엔터키 이벤트
   const searchInput = document.getElementById('item-search');
@@ -42,34 +60,104 @@ function addEventListenersToFilters() {
     searchInput.addEventListener('keypress', (e) => {
       if (e.key === 'Enter') applySearch();
     });
-    // (선택사항) 검색어를 다 지웠을 때 자동으로 초기화하고 싶다면 아래 주석 해제
-    /*
-    searchInput.addEventListener('input', (e) => {
-      if (e.target.value === '') applySearch();
+    // [추가] 입력하는 동안 검색 (서버 색인 검색이라 전체 품목을 받지 않음)
+    searchInput.addEventListener('input', () => {
+      clearTimeout(searchTimer);
+      searchTimer = setTimeout(applySearch, 250);
     });
-    */
   }
 }
 
 function fetchAndRender() {
   showLoading('itemReportTable');
   const qs = buildQueryString();
-  fetch(`/api/${currentBrand}/data/item?${qs}`)
+  // [수정] 구분/시리즈 행만 먼저 받음 (품목은 시리즈를 펼칠 때 조회)
+  fetch(`/api/${currentBrand}/data/item/series?${qs}`)
     .then((res) => {
       if (!res.ok) throw new Error(`HTTP error! status: ${res.status}`);
       return res.json();
     })
-    .then((resp) => {
-      if (resp.error) return handleError(resp.error, 'itemReportTable');
-      buildTable(resp.months, resp.rows);
-      renderChartAndRank(resp.top_series_data);
-      showTable('itemReportTable');
-    })
+    .then((resp) => renderSeries(qs, resp))
     .catch((err) =>
       handleError('데이터 로드 중 오류 발생: ' + err.message, 'itemReportTable')
     );
 }
 
+function renderSeries(qs, resp) {
+  if (resp.error) return handleError(resp.error, 'itemReportTable');
+  currentMonths = resp.months;
+  currentQs = qs;
+  buildTable(resp.months, resp.rows);
+  renderChartAndRank(resp.top_series_data);
+  showTable('itemReportTable');
+  if (document.getElementById('item-search').value) applySearch();
+}
+
+function initLazyItems(tbodyId) {
+  const tableBody = document.getElementById(tbodyId);
+  if (!tableBody) return;
+
+  tableBody.addEventListener('click', (event) => {
+    const moreRow = event.target.closest('.load-more-row');
+    if (moreRow) {
+      const seriesRow = tableBody.querySelector(
+        `tr[data-group-id="${moreRow.dataset.parentId}"]`
+      );
+      moreRow.remove();
+      loadItemPage(tableBody, seriesRow, Number(moreRow.dataset.offset));
+      return;
+    }
+    // initCollapse가 먼저 open을 토글하므로 펼쳐진 상태이고 아직 품목이 없을 때만 조회
+    const header = event.target.closest('tr.level-2[data-lazy]');
+    if (header && header.classList.contains('open') && !header.dataset.loaded) {
+      header.dataset.loaded = '1';
+      loadItemPage(tableBody, header, 0);
+    }
+  });
+}
+
+function loadItemPage(tableBody, seriesRow, offset) {
+  const [sort, order] = document.getElementById('item-sort').value.split(':');
+  const params = new URLSearchParams(currentQs);
+  params.append('cat_name', seriesRow.dataset.catName);
+  params.append('series_name', seriesRow.dataset.seriesName);
+  params.append('sort', sort);
+  params.append('order', order);
+  params.append('offset', offset);
+  params.append('limit', ITEM_PAGE_SIZE);
+  fetch(`/api/${currentBrand}/data/item/children?${params.toString()}`)
+    .then((res) => {
+      if (!res.ok) throw new Error(`HTTP error! status: ${res.status}`);
+      return res.json();
+    })
+    .then((resp) => {
+      const seriesId = seriesRow.dataset.groupId;
+      let html = resp.rows
+        .map((row) => buildRowRecursive(row, currentMonths))
+        .join('');
+      const nextOffset = resp.offset + resp.rows.length;
+      if (nextOffset < resp.total) {
+        html += `<tr class="load-more-row" data-parent-id="${seriesId}" data-offset="${nextOffset}">
+          <td colspan="${currentMonths.length * 2 + 3}">더 보기 (${nextOffset.toLocaleString()} / ${resp.total.toLocaleString()})</td></tr>`;
+      }
+      const siblings = tableBody.querySelectorAll(
+        `tr[data-parent-id="${seriesId}"]`
+      );
+      const anchor = siblings.length ? siblings[siblings.length - 1] : seriesRow;
+      anchor.insertAdjacentHTML('afterend', html);
+      // 시리즈가 펼쳐져 있으면 새 품목 행도 바로 표시
+      if (seriesRow.classList.contains('open')) {
+        tableBody
+          .querySelectorAll(`tr[data-parent-id="${seriesId}"]`)
+          .forEach((tr) => tr.classList.add('visible'));
+      }
+    })
+    .catch((err) => {
+      delete seriesRow.dataset.loaded;
+      console.error('품목 로드 중 오류 발생:', err);
+    });
+}
+
 function buildQueryString() {
   const params = new URLSearchParams();
   const getCheckedValues = (selector) =>
@@ -112,7 +200,12 @@ function buildRowRecursive(row, months) {
   let rowClass = `level-${row.level}`;
   if (!isItemRow && !isSubtotalRow) rowClass += ' collapsible-header';
   const parentAttr = row.parentId ? `data-parent-id="${row.parentId}"` : '';
-  html += `<tr class="${rowClass}" data-group-id="${row.id}" ${parentAttr}>`;
+  // [추가] 품목을 아직 받지 않은 시리즈 행 (펼칠 때 조회)
+  const lazyAttr =
+    row.level === 2 && row.item_count > 0 && !row.children.length
+      ? `data-lazy="1" data-cat-name="${row.parentId.slice(4)}" data-series-name="${row.name}"`
+      : '';
+  html += `<tr class="${rowClass}" data-group-id="${row.id}" ${parentAttr} ${lazyAttr}>`;
 
   let nameCell = `<td>${row.name}`;
   if (isItemRow) {
@@ -221,63 +314,46 @@ function handleSeriesClick(seriesName) {
 }
 
 /**
- * [핵심 수정] 검색 적용 및 초기화 로직
+ * [수정] 품목 검색: 서버 검색 색인(/items/search)으로 찾은 품목만 표시
+ * 검색어를 지우면 구분/시리즈 화면으로 돌아감
  */
 function applySearch() {
-  const searchInput = document.getElementById('item-search');
-  const searchTerm = searchInput.value.toLowerCase();
-  const tbody = document.getElementById('itemTableBody');
-  if (!tbody) return;
-  const allTrs = Array.from(tbody.querySelectorAll('tr'));
-
-  // 1. 검색어가 없을 때 (초기화)
+  clearTimeout(searchTimer);
+  const searchTerm = document.getElementById('item-search').value.trim();
   if (!searchTerm) {
-    allTrs.forEach((tr) => {
-      // ★ 중요: 강제로 부여했던 inline display 스타일을 제거합니다.
-      // 이렇게 해야 CSS의 기본 동작(접기/펼치기)이 다시 살아납니다.
-      tr.style.display = '';
-
-      // 검색으로 펼쳐졌던 것들을 다시 닫힌 상태로 되돌립니다.
-      tr.classList.remove('visible');
-      tr.classList.remove('open');
-    });
+    fetchAndRender();
     return;
   }
+  const params = new URLSearchParams(currentQs);
+  params.append('q', searchTerm);
+  params.append('limit', SEARCH_LIMIT);
+  fetch(`/api/${currentBrand}/items/search?${params.toString()}`)
+    .then((res) => {
+      if (!res.ok) throw new Error(`HTTP error! status: ${res.status}`);
+      return res.json();
+    })
+    .then((resp) => {
+      // 응답이 늦게 도착한 이전 검색어의 결과는 무시
+      if (resp.query !== document.getElementById('item-search').value.trim()) return;
+      renderSearchResults(resp.rows);
+    })
+    .catch((err) => console.error('품목 검색 중 오류 발생:', err));
+}
 
-  // 2. 검색어가 있을 때
-  const visibleRows = new Set();
-  allTrs.forEach((tr) => {
-    if (tr.classList.contains('level-3')) {
-      // 품목명 검색
-      const itemName = tr
-        .querySelector('td:first-child')
-        .textContent.toLowerCase();
-      if (itemName.includes(searchTerm)) {
-        visibleRows.add(tr.dataset.groupId);
-        let parentId = tr.dataset.parentId;
-        while (parentId) {
-          visibleRows.add(parentId);
-          const parentRow = tbody.querySelector(
-            `[data-group-id="${parentId}"]`
-          );
-          parentId = parentRow ? parentRow.dataset.parentId : null;
-        }
-      }
-    }
-  });
-
-  allTrs.forEach((tr) => {
-    const groupId = tr.dataset.groupId;
-    // 합계행(level-0)이나 검색된 그룹에 포함되면 강제로 보여줌
-    if (tr.classList.contains('level-0') || visibleRows.has(groupId)) {
-      tr.style.display = 'table-row'; // 강제 표시
-      tr.classList.add('visible');
-      // 품목(level-3)이 아니면(부모면) 펼침 아이콘 표시
-      if (!tr.classList.contains('level-3')) {
-        tr.classList.add('open');
-      }
-    } else {
-      tr.style.display = 'none'; // 강제 숨김
-    }
-  });
+function renderSearchResults(rows) {
+  const tbody = document.getElementById('itemTableBody');
+  if (!tbody) return;
+  if (!rows.length) {
+    tbody.innerHTML = `<tr><td colspan="${currentMonths.length * 2 + 3}">검색 결과가 없습니다.</td></tr>`;
+    return;
+  }
+  // 검색 결과는 부모 행 없이 바로 표시 (이름 앞에 구분 / 시리즈)
+  tbody.innerHTML = rows
+    .map((row) =>
+      buildRowRecursive(
+        { ...row, parentId: null, name: `${row.category} / ${row.series} / ${row.name}` },
+        currentMonths
+      )
+    )
+    .join('');
 }
@@ -0,0 +1,136 @@
+# app/warming.py
+# 데이터 업데이트 성공 후 자주 보는 화면의 집계를 미리 계산해 캐시를 채웁니다 (요청 경로 밖, 업데이트 작업 스레드에서 실행).
+# - 대시보드 첫 화면이 일괄 API로 요청하는 조회 (필터 목록, 메인 집계, 품목 시리즈 행 · 필터 없음), 통합('all') 메인 화면 포함
+# - 기본 화면(최신 연도 · 전체 월 · 전년 비교)
+# - 최근 API 요청에서 많이 쓰인 필터 조합 상위 N개 (제한 시간 안에서만)
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from database_setup import BRANDS, DATABASE_NAME
+from .services import get_filter_options, ALL_BRAND
+
+WARM_TIME_BUDGET = float(os.environ.get('WARM_TIME_BUDGET', 60))
+WARM_TOP_N = int(os.environ.get('WARM_TOP_N', 20))
+WARM_USAGE_DAYS = int(os.environ.get('WARM_USAGE_DAYS', 14))
+# 사용 기록은 메모리에 모았다가 이 간격(초)마다 DB에 반영
+USAGE_FLUSH_SECONDS = float(os.environ.get('USAGE_FLUSH_SECONDS', 30))
+
+# 예열할 수 있는 화면 종류 (routes.py의 개별/일괄 API 화면)
+VIEWS = ('data', 'item', 'item_series')
+# [수정] 대시보드 첫 화면이 요청하는 화면 종류 (메인: data, 품목: item_series)
+PAGE_VIEWS = ('data', 'item_series')
+
+_usage = Counter()
+_usage_lock = threading.Lock()
+_flush_thread = None
+
+
+def _filters_tuple(kind, warehouses=(), categories=(), main_year='', comp_year='', start_month='', end_month=''):
+    """routes.py가 만드는 것과 같은 형태의 필터 튜플"""
+    filters = {
+        'warehouses': list(warehouses),
+        'categories': list(categories),
+        'main_year': main_year,
+        'start_month': start_month,
+        'end_month': end_month,
+    }
+    if kind == 'data': filters['comp_year'] = comp_year
+    return tuple(sorted(filters.items()))
+
+
+def record_view(kind, brand, filters_tuple):
+    """API 요청의 필터 조합 사용 횟수를 기록합니다.
+    [수정] 요청에서는 메모리에만 더하고, DB 반영은 백그라운드 스레드가 합니다 (적재 중 잠금을 기다리지 않음)."""
+    global _flush_thread
+    if brand not in BRANDS: return
+    key = (kind, brand, json.dumps(filters_tuple, ensure_ascii=False))
+    with _usage_lock:
+        _usage[key] += 1
+        if _flush_thread is None:
+            # 워커 프로세스마다 처음 기록할 때 시작
+            _flush_thread = threading.Thread(target=_flush_loop, name='usage-flush', daemon=True)
+            _flush_thread.start()
+
+
+def _flush_loop():
+    while True:
+        time.sleep(USAGE_FLUSH_SECONDS)
+        flush_usage()
+
+
+def flush_usage():
+    """모아 둔 사용 횟수를 DB에 반영합니다 (실패하면 다음 반영 때 다시 시도)."""
+    with _usage_lock:
+        pending = list(_usage.items())
+        _usage.clear()
+    if not pending: return
+    try:
+        with sqlite3.connect(DATABASE_NAME, timeout=5) as conn:
+            conn.executemany(
+                "INSERT INTO filter_usage (kind, brand, filters, hits) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (kind, brand, filters) DO UPDATE SET hits = hits + excluded.hits, last_used = CURRENT_TIMESTAMP",
+                [(*key, hits) for key, hits in pending]
+            )
+        conn.close()
+    except sqlite3.Error as e:
+        print(f"사용 기록 저장 실패 (다음에 다시 시도): {e}")
+        # [수정] 저장하지 못한 횟수는 버리지 않고 되돌려 둠
+        with _usage_lock: _usage.update(dict(pending))
+
+
+def top_views(limit=WARM_TOP_N, days=WARM_USAGE_DAYS):
+    """최근 많이 조회된 (kind, brand, filters_tuple) 목록"""
+    with sqlite3.connect(DATABASE_NAME, timeout=5) as conn:
+        rows = conn.execute(
+            "SELECT kind, brand, filters FROM filter_usage WHERE last_used >= datetime('now', ?) ORDER BY hits DESC LIMIT ?",
+            (f'-{days} days', limit)
+        ).fetchall()
+    conn.close()
+    return [(kind, brand, tuple((k, v) for k, v in json.loads(filters))) for kind, brand, filters in rows]
+
+
+def default_views(brand):
+    """첫 화면과 기본 화면(최신 연도, 전체 월, 전년 비교)의 (kind, brand, filters_tuple) 목록"""
+    _, _, years, months = get_filter_options(brand)
+    views = [(kind, brand, _filters_tuple(kind)) for kind in PAGE_VIEWS]
+    if years and months:
+        comp_year = years[1] if len(years) > 1 else ''
+        for kind in PAGE_VIEWS:
+            views.append((kind, brand, _filters_tuple(kind, main_year=years[0], comp_year=comp_year,
+                                                        start_month=months[0], end_month=months[-1])))
+    return views
+
+
+def warm_caches(app, time_budget=WARM_TIME_BUDGET):
+    """기본 화면과 자주 쓰는 필터 조합을 미리 계산합니다. 반환: {warmed(성공한 조회 수), skipped, seconds}"""
+    start = time.monotonic()
+    warmed = skipped = 0
+    with app.app_context():
+        # [수정] 집계 결과뿐 아니라 라우트가 실제로 내보내는 JSON 바이트(+gzip) 캐시까지 채움
+        from .routes import prebuild_view
+        flush_usage()
+        # [수정] 필터 목록도 조회 하나로 세고, 실패하면 세지 않음
+        views = [('filters', brand, None) for brand in (*BRANDS, ALL_BRAND)]
+        for brand in BRANDS:
+            try: views.extend(default_views(brand))
+            except Exception as e: print(f"캐시 예열 화면 목록 실패 ({brand}): {e}")
+        views.append(('data', ALL_BRAND, _filters_tuple('data')))
+        try:
+            views.extend(v for v in top_views() if v not in views and v[0] in VIEWS and v[1] in BRANDS)
+        except sqlite3.Error as e:
+            print(f"사용 기록 조회 실패: {e}")
+
+        for kind, brand, filters_tuple in views:
+            if time.monotonic() - start > time_budget:
+                skipped += 1
+                continue
+            try:
+                prebuild_view(kind, brand, filters_tuple)
+                warmed += 1
+            except Exception as e:
+                print(f"캐시 예열 실패 ({kind}/{brand}): {e}")
+    return {'warmed': warmed, 'skipped': skipped, 'seconds': round(time.monotonic() - start, 3)}
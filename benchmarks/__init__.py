@@ -0,0 +1,4 @@
+# benchmarks/
+# 합성 데이터로 적재(migrate_data)·서비스 함수·API 엔드포인트의 성능을 측정하는 벤치마크
+# - synthetic.py: 판매현황/발주표 시트를 흉내 내는 데이터 생성기와 가짜 gspread 클라이언트
+# - run.py: 측정 실행, 결과 JSON 저장, 기준 결과와 비교 (python -m benchmarks.run --help)
@@ -0,0 +1,252 @@
+# benchmarks/run.py
+# 합성 데이터로 적재·서비스 함수·API 엔드포인트를 측정하고 결과를 JSON으로 저장합니다.
+#
+#   python -m benchmarks.run --rows 100000 --out bench.json
+#   python -m benchmarks.run --rows 100000 --baseline bench.json   # 기준 대비 회귀 확인 (회귀 시 종료 코드 1)
+#
+# - cold: 캐시를 모두 비운 직후 1회 실행 / warm: 캐시가 찬 상태에서 --repeat 회 실행한 지연 분포
+# - peak_mb: cold 실행 중 tracemalloc으로 잰 파이썬 할당 최대치 (시간 측정과는 따로 실행)
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+try:
+    import resource  # 윈도우에는 없음
+except ImportError:
+    resource = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _percentiles(samples_ms):
+    values = np.asarray(samples_ms, dtype=float)
+    return {
+        'p50': round(float(np.percentile(values, 50)), 3),
+        'p90': round(float(np.percentile(values, 90)), 3),
+        'p99': round(float(np.percentile(values, 99)), 3),
+        'mean': round(float(values.mean()), 3),
+        'min': round(float(values.min()), 3),
+        'max': round(float(values.max()), 3),
+    }
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def _peak_mb(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 2)
+    finally:
+        tracemalloc.stop()
+
+
+class Bench:
+    """측정 결과 모음 {이름: {cold_ms, peak_mb, warm_ms{...}}}"""
+
+    def __init__(self, repeat, reset):
+        self.repeat = repeat
+        self.reset = reset
+        self.results = {}
+
+    def measure(self, name, fn, warm=True):
+        self.reset()
+        cold = _timed(fn)
+        self.reset()
+        peak = _peak_mb(fn)
+        result = {'cold_ms': round(cold, 3), 'peak_mb': peak}
+        if warm and self.repeat:
+            fn()
+            result['warm_ms'] = _percentiles([_timed(fn) for _ in range(self.repeat)])
+        self.results[name] = result
+        warm_p50 = result.get('warm_ms', {}).get('p50')
+        print(f"  {name:<60} cold {cold:10.1f} ms  warm p50 {warm_p50 if warm_p50 is not None else '-':>8} ms  peak {peak:8.1f} MB")
+        return result
+
+
+def _filter_sets(years, months):
+    """측정할 필터 조합: 첫 화면, 최신 연도+전년 비교, 분기, 창고 선택"""
+    latest = years[0] if years else ''
+    previous = years[1] if len(years) > 1 else ''
+    return {
+        'all': {},
+        'latest_vs_prev': {'main_year': latest, 'comp_year': previous, 'start_month': months[0] if months else '', 'end_month': months[-1] if months else ''},
+        'quarter': {'main_year': latest, 'comp_year': previous, 'start_month': '01', 'end_month': '03'},
+        'warehouse': {'main_year': latest, 'warehouses': ['안경원', '면세']},
+    }
+
+
+def _filters_tuple(values, with_comp=True):
+    filters = {'warehouses': values.get('warehouses', []), 'categories': values.get('categories', []),
+               'main_year': values.get('main_year', ''), 'start_month': values.get('start_month', ''),
+               'end_month': values.get('end_month', '')}
+    if with_comp: filters['comp_year'] = values.get('comp_year', '')
+    return tuple(sorted(filters.items()))
+
+
+def _base_rows(services, brand, filters):
+    """필터에 맞는 sales_data_<brand> 원본 행 (롤업을 쓰기 전 방식의 조회, 비교 기준)"""
+    from database_setup import sql_int
+    where, params = services._build_where(filters)
+    query = (f"SELECT warehouse, category, series, item_name, month_year, month_year AS month_str, "
+             f"{sql_int('quantity')} AS quantity, {sql_int('stock')} AS stock, {sql_int('backorder')} AS backorder "
+             f"FROM sales_data_{brand} {where}")
+    return services._read_query(query, params)
+
+
+def _query_string(values, with_comp=True):
+    from urllib.parse import urlencode
+    params = [('warehouse', w) for w in values.get('warehouses', [])]
+    params += [('category', c) for c in values.get('categories', [])]
+    keys = ['main_year', 'comp_year', 'start_month', 'end_month'] if with_comp else ['main_year', 'start_month', 'end_month']
+    params += [(k, values.get(k, '')) for k in keys]
+    return urlencode(params)
+
+
+def run(args):
+    workdir = args.workdir or tempfile.mkdtemp(prefix='sales-bench-')
+    os.makedirs(workdir, exist_ok=True)
+    # 모듈이 import 시점에 환경 변수를 읽으므로 먼저 설정
+    os.environ['SALES_DB_PATH'] = os.path.join(workdir, 'sales.db')
+    os.environ['CACHE_DIR'] = os.path.join(workdir, 'cache')
+    os.environ['CACHE_LOCK_DIR'] = os.path.join(workdir, 'cache_locks')
+    os.environ['AGGREGATION_ENGINE'] = args.engine
+    os.environ.setdefault('FLASK_SECRET_KEY', 'benchmark')
+    sys.path.insert(0, ROOT)
+    for name in ('sales.db', 'sales.db-wal', 'sales.db-shm'):
+        path = os.path.join(workdir, name)
+        if os.path.exists(path): os.remove(path)
+
+    from database_setup import BRANDS, create_table
+    import migrate_data
+    from benchmarks.synthetic import synthetic_client
+
+    print(f"합성 데이터 생성: 브랜드당 {args.rows:,}행 (작업 폴더 {workdir})")
+    client = synthetic_client(BRANDS, args.rows, args.skus, seed=args.seed)
+    create_table()
+
+    print("적재")
+    load = {}
+    for brand in BRANDS:
+        load[f"migrate_google_sheet_to_db[{brand}]"] = round(_timed(lambda: migrate_data.migrate_google_sheet_to_db(brand, client=client)), 3)
+    # 내용이 그대로인 재적재 (증분 적재: 바뀐 월 없음)
+    load['migrate_brands[all, unchanged]'] = round(_timed(lambda: migrate_data.migrate_brands(BRANDS, client=client)), 3)
+
+    from app import create_app, cache
+    from app import services
+    from app.columnar import store as columnar_store
+    app = create_app()
+
+    def reset():
+        cache.clear()
+        columnar_store._brands.clear()
+
+    bench = Bench(args.repeat, reset)
+    for name, ms in load.items():
+        bench.results[name] = {'cold_ms': ms}
+        print(f"  {name:<60} {ms:10.1f} ms")
+
+    with app.app_context():
+        print("서비스 함수")
+        for brand in BRANDS:
+            bench.measure(f"get_filter_options[{brand}]", lambda: services.get_filter_options(brand))
+            _, _, years, months = services.get_filter_options(brand)
+            for label, values in _filter_sets(years, months).items():
+                main, item = _filters_tuple(values), _filters_tuple(values, with_comp=False)
+                bench.measure(f"process_data[{brand},{label}]", lambda: services.process_data(brand, main))
+                bench.measure(f"process_item_data[{brand},{label}]", lambda: services.process_item_data(brand, item))
+                bench.measure(f"_get_base_data[{brand},{label}]", lambda: _base_rows(services, brand, dict(main)))
+
+    print("API 엔드포인트")
+    http = app.test_client()
+    with http.session_transaction() as session: session['logged_in'] = True
+    for brand in BRANDS:
+        with app.app_context():
+            _, _, years, months = services.get_filter_options(brand)
+        bench.measure(f"GET /api/{brand}/filters", lambda: http.get(f"/api/{brand}/filters"))
+        for label, values in _filter_sets(years, months).items():
+            for fmt in ('', '&format=columnar'):
+                bench.measure(f"GET /api/{brand}/data?{label}{fmt}", lambda: http.get(f"/api/{brand}/data?{_query_string(values)}{fmt}"))
+                bench.measure(f"GET /api/{brand}/data/item?{label}{fmt}", lambda: http.get(f"/api/{brand}/data/item?{_query_string(values, False)}{fmt}"))
+
+    result = {
+        'meta': {
+            'rows_per_brand': args.rows,
+            'skus': args.skus,
+            'seed': args.seed,
+            'repeat': args.repeat,
+            'engine': args.engine,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1) if resource else None,
+        },
+        'results': bench.results,
+    }
+    if not args.keep and not args.workdir: shutil.rmtree(workdir, ignore_errors=True)
+    return result
+
+
+def compare(result, baseline, threshold=0.2, floor_ms=1.0):
+    """기준 결과 대비 느려진 항목 목록 [(이름, 지표, 기준 ms, 현재 ms)]
+    threshold(비율)와 floor_ms(절대 차이)를 모두 넘을 때만 회귀로 봅니다."""
+    regressions = []
+    for name, current in result['results'].items():
+        base = baseline.get('results', {}).get(name)
+        if not base: continue
+        pairs = [('cold_ms', base.get('cold_ms'), current.get('cold_ms'))]
+        if 'warm_ms' in base and 'warm_ms' in current:
+            pairs.append(('warm_p50_ms', base['warm_ms']['p50'], current['warm_ms']['p50']))
+        for metric, before, after in pairs:
+            if before is None or after is None: continue
+            if after > before * (1 + threshold) and after - before > floor_ms:
+                regressions.append((name, metric, before, after))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='판매 대시보드 성능 벤치마크')
+    parser.add_argument('--rows', type=int, default=100_000, help='브랜드당 행 수 (1만 ~ 1000만)')
+    parser.add_argument('--skus', type=int, default=None, help='브랜드당 품목 수 (기본: 행 수/20, 최대 3000)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5, help='warm 측정 반복 횟수')
+    parser.add_argument('--engine', choices=['sql', 'columnar'], default=os.environ.get('AGGREGATION_ENGINE', 'sql'))
+    parser.add_argument('--out', default='bench_result.json', help='결과 JSON 경로')
+    parser.add_argument('--baseline', help='비교할 기준 결과 JSON')
+    parser.add_argument('--threshold', type=float, default=0.2, help='회귀로 볼 느려짐 비율 (기본 0.2 = 20%%)')
+    parser.add_argument('--workdir', help='DB/캐시를 둘 폴더 (지정하면 측정 후 지우지 않음)')
+    parser.add_argument('--keep', action='store_true', help='임시 작업 폴더를 지우지 않음')
+    args = parser.parse_args(argv)
+
+    result = run(args)
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"결과 저장: {args.out} (최대 RSS {result['meta']['max_rss_mb']} MB)")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.threshold)
+        if regressions:
+            print(f"\n회귀 {len(regressions)}건 (기준 대비 {args.threshold:.0%} 이상 느려짐):")
+            for name, metric, before, after in regressions:
+                print(f"  {name} {metric}: {before:.1f} → {after:.1f} ms ({after / before - 1:+.0%})")
+            return 1
+        print("\n기준 대비 회귀 없음")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
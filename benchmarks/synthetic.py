@@ -0,0 +1,105 @@
+# benchmarks/synthetic.py
+# 실제 판매현황 시트와 비슷한 분포의 합성 데이터 생성기
+# - 품목(SKU)마다 시리즈/구분이 고정되고, 판매 빈도는 순위에 따라 줄어드는(Zipf) 분포
+# - 창고별 비중, 반품(음수 수량), 빈 시리즈/재고, 잘못된 month_year 값 포함
+# - FakeClient는 migrate_data가 쓰는 gspread 인터페이스(open/open_by_key → worksheet → get_all_*)만 흉내 냅니다.
+import numpy as np
+import pandas as pd
+
+from migrate_data import BRAND_CONFIG, BACKORDER_TAB_NAME
+
+SHEET_COLUMNS = ['창고별', '구분', '월별', '품목별', '수량', '시리즈', '재고']
+WAREHOUSES = {'안경원': 0.35, '온라인주문': 0.2, '면세': 0.15, '수출': 0.1, 'B2B': 0.1, '클립': 0.05, '기타창고': 0.05}
+CATEGORIES = {'안경테': 0.45, '선글라스': 0.3, '클립': 0.1, '케이스': 0.1, '부품': 0.05}
+ODD_MONTHS = ['', '2024-01', '24/1', 'xx', '24/13']
+
+
+def brand_frame(brand, rows, skus=None, years=3, last_year=2024, return_ratio=0.04, odd_ratio=0.001, seed=0):
+    """브랜드 탭 한 개 분량의 시트 데이터 (시트 헤더 그대로의 DataFrame)"""
+    rng = np.random.default_rng([seed, sum(brand.encode())])
+    skus = skus or max(10, min(rows // 20, 3000))
+    n_series = max(1, skus // 10)
+
+    # 품목별 고정 속성
+    sku_series = rng.integers(0, n_series, skus)
+    series_names = np.array([f"{brand.upper()}{i:04d}" for i in range(n_series)], dtype=object)
+    series_category = rng.choice(list(CATEGORIES), n_series, p=list(CATEGORIES.values()))
+    item_names = np.array([f"{series_names[s]}-C{i % 20:02d}" for i, s in enumerate(sku_series)], dtype=object)
+    sku_stock = rng.integers(0, 500, skus).astype(object)
+    sku_stock[rng.random(skus) < 0.05] = ''
+    popularity = 1.0 / np.arange(1, skus + 1) ** 1.1
+    popularity /= popularity.sum()
+
+    sku = rng.choice(skus, rows, p=popularity)
+    year = rng.integers(last_year - years + 1, last_year + 1, rows)
+    month = rng.integers(1, 13, rows)
+    month_year = np.char.add(np.char.add(np.char.zfill((year % 100).astype(str), 2), '/'), np.char.zfill(month.astype(str), 2)).astype(object)
+    odd = rng.random(rows) < odd_ratio
+    month_year[odd] = rng.choice(ODD_MONTHS, odd.sum())
+
+    quantity = rng.geometric(0.3, rows)
+    returns = rng.random(rows) < return_ratio
+    quantity[returns] = -rng.integers(1, 4, returns.sum())
+
+    series = series_names[sku_series[sku]]
+    series[rng.random(rows) < 0.02] = ''
+    return pd.DataFrame({
+        '창고별': rng.choice(list(WAREHOUSES), rows, p=list(WAREHOUSES.values())),
+        '구분': series_category[sku_series[sku]],
+        '월별': month_year,
+        '품목별': item_names[sku],
+        '수량': quantity,
+        '시리즈': series,
+        '재고': sku_stock[sku],
+    }, columns=SHEET_COLUMNS)
+
+
+def backorder_values(frames, ratio=0.1, seed=0):
+    """발주표 시트 값 (L열 품목명, M열 미입고 수량) - 품목의 일부에만 미입고 수량"""
+    rng = np.random.default_rng(seed)
+    items = pd.unique(pd.concat([df['품목별'] for df in frames.values()]))
+    picked = items[rng.random(len(items)) < ratio]
+    header = [''] * 11 + ['품목명', '미입고잔량']
+    return [header] + [[''] * 11 + [name, f"{rng.integers(1, 2000):,}"] for name in picked]
+
+
+class FakeWorksheet:
+    def __init__(self, records=None, values=None):
+        self._records, self._values = records, values
+
+    def get_all_records(self):
+        # 대용량에서도 dict 목록을 만들지 않도록 DataFrame을 그대로 반환 (pd.DataFrame(data)에 그대로 들어감)
+        return self._records
+
+    def get_all_values(self):
+        return self._values
+
+
+class FakeSpreadsheet:
+    def __init__(self, tabs):
+        self._tabs = tabs
+
+    def worksheet(self, name):
+        import gspread
+        if name not in self._tabs: raise gspread.exceptions.WorksheetNotFound(name)
+        return self._tabs[name]
+
+
+class FakeClient:
+    """migrate_data.migrate_brands(client=...)에 넘길 수 있는 가짜 gspread 클라이언트"""
+
+    def __init__(self, frames, backorder):
+        self._sales = FakeSpreadsheet({BRAND_CONFIG[b]['sheet_tab']: FakeWorksheet(records=df) for b, df in frames.items()})
+        self._backorder = FakeSpreadsheet({BACKORDER_TAB_NAME: FakeWorksheet(values=backorder)})
+
+    def open(self, name):
+        return self._sales
+
+    def open_by_key(self, key):
+        return self._backorder
+
+
+def synthetic_client(brands, rows, skus=None, seed=0, **kwargs):
+    """브랜드별 rows행의 합성 시트를 담은 FakeClient"""
+    frames = {brand: brand_frame(brand, rows, skus, seed=seed, **kwargs) for brand in brands}
+    return FakeClient(frames, backorder_values(frames, seed=seed))
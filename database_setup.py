@@ -1,14 +1,253 @@
+import json
+import os
 import sqlite3
 
-DATABASE_NAME = 'sales.db'
+# [수정] 실행 위치(작업 디렉터리)와 무관하게 프로젝트 루트의 sales.db 사용 (SALES_DB_PATH로 변경 가능)
+DATABASE_NAME = os.environ.get('SALES_DB_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sales.db'))
 # 브랜드별 테이블 이름 정의
 BRANDS = ['nine', 'curu']
 
+# month_year('YY/MM') 문자열에서 정수 year(4자리)/month를 계산하는 SQL
+# - 필터 조건을 인덱스로 처리할 수 있도록 적재 시점에 미리 계산해 둡니다.
+YEAR_SQL = "CASE WHEN substr(month_year, 1, 2) GLOB '[0-9][0-9]' THEN 2000 + CAST(substr(month_year, 1, 2) AS INTEGER) END"
+MONTH_SQL = "CAST(substr(month_year, 4, 2) AS INTEGER)"
+
+def sql_int(col):
+    """int(float(x)) 규칙(숫자가 아니면 0, 소수점 이하 버림)으로 SQLite 안에서 정수 변환"""
+    return f"(CASE WHEN typeof({col}) IN ('integer', 'real') THEN CAST({col} AS INTEGER) ELSE 0 END)"
+
+# 적재 시 미리 집계해 두는 롤업 테이블: 종류 → 집계 키
+# - wc: 창고×구분×월 (메인 대시보드, 필터 옵션)
+# - item: 창고×구분×시리즈×품목×월 (품목 대시보드, 창고 필터를 위해 창고 포함)
+ROLLUP_KEYS = {
+    'wc': ['warehouse', 'category', 'month_year'],
+    'item': ['warehouse', 'category', 'series', 'item_name', 'month_year'],
+}
+
+def rollup_table_name(kind, brand):
+    return f"sales_rollup_{kind}_{brand}"
+
+# 적재 시 함께 갱신하는 차원 테이블: 종류 → 키 (월별 원본 행 수 포함)
+# - wc: 창고×구분×월 (필터 옵션의 창고/구분/연도/월, 창고 선택에 따른 구분 목록)
+# - series: 구분×시리즈×월 (구분 선택에 따른 시리즈 목록)
+DIMENSION_KEYS = {
+    'wc': ['warehouse', 'category', 'month_year'],
+    'series': ['category', 'series', 'month_year'],
+}
+
+def dimension_table_name(kind, brand):
+    return f"sales_dim_{kind}_{brand}"
+
+# [추가] 스키마 버전 (PRAGMA user_version): create_table의 테이블/인덱스 구성이 바뀌면 올립니다.
+SCHEMA_VERSION = 1
+
+# 품목 검색 색인: 구분×시리즈×품목 한 행씩 (FTS5 trigram → 부분 문자열 검색)
+def search_table_name(brand):
+    return f"sales_search_{brand}"
+
+def fill_year_month(conn, table_name):
+    """year/month가 비어있는(새로 적재된) 행의 정수 컬럼을 채웁니다."""
+    conn.execute(f"UPDATE {table_name} SET year = {YEAR_SQL}, month = {MONTH_SQL} WHERE month IS NULL")
+
+def _create_generation_table(conn):
+    # 데이터 세대 번호: 적재가 끝날 때마다 1씩 증가하며 캐시 키에 포함됩니다.
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS data_generation ("
+        "id INTEGER PRIMARY KEY CHECK (id = 1), generation INTEGER NOT NULL, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+    )
+    conn.execute("INSERT OR IGNORE INTO data_generation (id, generation) VALUES (1, 0)")
+
+def get_generation(conn):
+    row = conn.execute("SELECT generation FROM data_generation WHERE id = 1").fetchone()
+    return row[0] if row else 0
+
+def bump_generation(conn):
+    """데이터 세대 번호를 올립니다 (적재와 같은 트랜잭션 안에서 호출)."""
+    conn.execute("UPDATE data_generation SET generation = generation + 1, updated_at = CURRENT_TIMESTAMP WHERE id = 1")
+
+def _create_job_table(conn):
+    # 데이터 업데이트 백그라운드 작업 상태 (progress: 브랜드별 단계/저장 행수 JSON)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS update_jobs (
+            job_id TEXT PRIMARY KEY,
+            brand TEXT NOT NULL,
+            status TEXT NOT NULL,
+            progress TEXT NOT NULL DEFAULT '{}',
+            message TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            finished_at TIMESTAMP
+        )
+        """
+    )
+
+def set_job_progress(job_id, brand, stage, rows=None):
+    """작업의 브랜드별 진행 단계(fetching/cleaning/writing/done/error)를 기록합니다."""
+    entry = json.dumps({'stage': stage, 'rows': rows})
+    with sqlite3.connect(DATABASE_NAME, timeout=30) as conn:
+        conn.execute(
+            "UPDATE update_jobs SET progress = json_set(progress, '$.' || ?, json(?)), updated_at = CURRENT_TIMESTAMP WHERE job_id = ?",
+            (brand, entry, job_id)
+        )
+    conn.close()
+
+def _create_ingest_table(conn):
+    # 증분 적재용 월별 내용 해시 (해시가 바뀐 월만 다시 기록)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS ingest_month_hashes ("
+        "brand TEXT NOT NULL, month_year TEXT NOT NULL, content_hash TEXT NOT NULL, row_count INTEGER NOT NULL, "
+        "PRIMARY KEY (brand, month_year))"
+    )
+
+def _create_usage_table(conn):
+    # 캐시 예열용 조회 필터 사용 기록 (요청 종류·브랜드·필터 조합별 횟수)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS filter_usage ("
+        "kind TEXT NOT NULL, brand TEXT NOT NULL, filters TEXT NOT NULL, hits INTEGER NOT NULL DEFAULT 0, "
+        "last_used TIMESTAMP DEFAULT CURRENT_TIMESTAMP, PRIMARY KEY (kind, brand, filters))"
+    )
+
+def _migrate_table(conn, table_name):
+    """기존 DB에 year/month 컬럼과 인덱스를 추가합니다 (여러 번 실행해도 안전)."""
+    columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table_name})")}
+    for col in ('year', 'month'):
+        if col not in columns:
+            try:
+                conn.execute(f"ALTER TABLE {table_name} ADD COLUMN {col} INTEGER")
+            except sqlite3.OperationalError as e:
+                # 다른 프로세스가 먼저 추가한 경우
+                if 'duplicate column' not in str(e): raise
+    fill_year_month(conn, table_name)
+
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table_name}_ym_wh_cat ON {table_name} (year, month, warehouse, category)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table_name}_item ON {table_name} (item_name)")
+    # [추가] 증분 적재의 월 단위 삭제/롤업·차원 재계산 (month_year IN (...))용
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table_name}_month_year ON {table_name} (month_year)")
+
+def _create_rollup_tables(conn, brand):
+    """롤업 테이블을 만들고, 새로 만든 테이블 종류 목록을 반환합니다."""
+    created = []
+    for kind, keys in ROLLUP_KEYS.items():
+        rollup = rollup_table_name(kind, brand)
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (rollup,)).fetchone()
+        key_cols = ', '.join(f"{k} TEXT" for k in keys)
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {rollup} ({key_cols}, year INTEGER, month INTEGER, "
+            f"net INTEGER NOT NULL, neg INTEGER NOT NULL, stock INTEGER, backorder INTEGER)"
+        )
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{rollup}_ym_wh_cat ON {rollup} (year, month, warehouse, category)")
+        # [추가] 월별 부분 집계 조회 (month_year IN (...))용
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{rollup}_month_year ON {rollup} (month_year)")
+        # [추가] 품목 검색 결과의 월별 값 조회용
+        if 'item_name' in keys: conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{rollup}_item ON {rollup} (item_name)")
+        if not exists: created.append(kind)
+    return created
+
+def _create_dimension_tables(conn, brand):
+    """차원 테이블을 만들고, 새로 만든 테이블 종류 목록을 반환합니다."""
+    created = []
+    for kind, keys in DIMENSION_KEYS.items():
+        dim = dimension_table_name(kind, brand)
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (dim,)).fetchone()
+        key_cols = ', '.join(f"{k} TEXT" for k in keys)
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {dim} ({key_cols}, year INTEGER, month INTEGER, rows INTEGER NOT NULL)")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{dim}_keys ON {dim} ({', '.join(keys[:2])})")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{dim}_month_year ON {dim} (month_year)")
+        if not exists: created.append(kind)
+    return created
+
+def rebuild_dimensions(conn, brand, kinds=None, months=None):
+    """sales_data_<brand> 원본에서 차원 테이블을 다시 계산합니다 (months를 주면 해당 월만)."""
+    table_name = f"sales_data_{brand}"
+    where, params = '', []
+    if months is not None:
+        where = f"WHERE month_year IN ({', '.join('?' for _ in months)})"
+        params = list(months)
+    for kind in (kinds or DIMENSION_KEYS):
+        dim = dimension_table_name(kind, brand)
+        key_sql = ', '.join(DIMENSION_KEYS[kind])
+        conn.execute(f"DELETE FROM {dim} {where}", params)
+        conn.execute(
+            f"INSERT INTO {dim} ({key_sql}, year, month, rows) "
+            f"SELECT {key_sql}, MAX(year), MAX(month), COUNT(*) FROM {table_name} {where} GROUP BY {key_sql}",
+            params
+        )
+
+def _create_search_table(conn, brand):
+    """품목 검색 색인을 만들고, 새로 만들었으면 True를 반환합니다.
+    FTS5 trigram을 지원하지 않는 SQLite(3.34 미만)에서는 일반 테이블(LIKE 검색)로 만듭니다."""
+    table = search_table_name(brand)
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (table,)).fetchone(): return False
+    try:
+        conn.execute(f"CREATE VIRTUAL TABLE {table} USING fts5(item_name, series, category UNINDEXED, tokenize = 'trigram')")
+    except sqlite3.OperationalError:
+        conn.execute(f"CREATE TABLE {table} (item_name TEXT, series TEXT, category TEXT)")
+        conn.execute(f"CREATE INDEX idx_{table}_item ON {table} (item_name)")
+    return True
+
+def search_index_is_fts(conn, brand):
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE name = ?", (search_table_name(brand),)).fetchone()
+    return bool(row) and 'fts5' in row[0].lower()
+
+def rebuild_search_index(conn, brand):
+    """품목 롤업 테이블의 구분×시리즈×품목 목록으로 검색 색인을 다시 만듭니다 (품목 수만큼의 작은 테이블)."""
+    table = search_table_name(brand)
+    conn.execute(f"DELETE FROM {table}")
+    conn.execute(
+        f"INSERT INTO {table} (item_name, series, category) "
+        f"SELECT DISTINCT item_name, series, category FROM {rollup_table_name('item', brand)} WHERE item_name IS NOT NULL"
+    )
+
+def rebuild_rollups(conn, brand, kinds=None, months=None):
+    """sales_data_<brand> 원본에서 롤업 테이블을 다시 계산합니다 (호출한 쪽의 트랜잭션 안에서 실행).
+
+    months를 주면 해당 month_year만 다시 계산합니다.
+    """
+    table_name = f"sales_data_{brand}"
+    qty = sql_int('quantity')
+    where, params = '', []
+    if months is not None:
+        where = f"WHERE month_year IN ({', '.join('?' for _ in months)})"
+        params = list(months)
+    for kind in (kinds or ROLLUP_KEYS):
+        rollup = rollup_table_name(kind, brand)
+        key_sql = ', '.join(ROLLUP_KEYS[kind])
+        conn.execute(f"DELETE FROM {rollup} {where}", params)
+        conn.execute(
+            f"""
+            INSERT INTO {rollup} ({key_sql}, year, month, net, neg, stock, backorder)
+            SELECT {key_sql}, MAX(year), MAX(month),
+                   SUM({qty}), SUM(CASE WHEN {qty} < 0 THEN {qty} ELSE 0 END),
+                   MAX({sql_int('stock')}), MAX({sql_int('backorder')})
+            FROM {table_name} {where}
+            GROUP BY {key_sql}
+            """,
+            params
+        )
+
+def schema_is_current():
+    """DB 스키마가 SCHEMA_VERSION 이상이면 True (읽기만 하므로 적재 중에도 바로 반환)"""
+    if not os.path.exists(DATABASE_NAME): return False
+    conn = sqlite3.connect(DATABASE_NAME, timeout=30)
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION
+    finally:
+        conn.close()
+
 def create_table():
-    with sqlite3.connect(DATABASE_NAME) as conn:
+    # [수정] 적재 트랜잭션이 끝날 때까지 기다림 (기본 5초 대기로는 database is locked)
+    with sqlite3.connect(DATABASE_NAME, timeout=30) as conn:
+        # [추가] WAL 모드: 적재 트랜잭션 중에도 대시보드는 이전 스냅샷을 계속 읽음
+        conn.execute("PRAGMA journal_mode=WAL")
+        _create_generation_table(conn)
+        _create_job_table(conn)
+        _create_ingest_table(conn)
+        _create_usage_table(conn)
         for brand in BRANDS:
             table_name = f"sales_data_{brand}"
             # [수정] backorder 컬럼 추가
+            # [수정] 인덱스용 정수 year/month 컬럼 추가
             conn.execute(
                 f'''
                 CREATE TABLE IF NOT EXISTS {table_name} (
@@ -21,11 +260,23 @@ def create_table():
                     series TEXT,
                     stock INTEGER,
                     backorder INTEGER DEFAULT 0,
+                    year INTEGER,
+                    month INTEGER,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
                 '''
             )
+            _migrate_table(conn, table_name)
+            # [추가] 롤업 테이블이 없던 기존 DB는 현재 데이터로 바로 채움
+            created = _create_rollup_tables(conn, brand)
+            if created: rebuild_rollups(conn, brand, created)
+            # [추가] 필터 옵션용 차원 테이블
+            created = _create_dimension_tables(conn, brand)
+            if created: rebuild_dimensions(conn, brand, created)
+            # [추가] 품목 검색 색인
+            if _create_search_table(conn, brand): rebuild_search_index(conn, brand)
             print(f"테이블 '{table_name}'이(가) 준비되었습니다.")
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
 
 if __name__ == '__main__':
-    create_table()
\ No newline at end of file
+    create_table()
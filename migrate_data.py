@@ -1,11 +1,16 @@
 import sqlite3
+import hashlib
+from itertools import islice
+import numpy as np
 import pandas as pd
 import gspread
 from google.oauth2.service_account import Credentials
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from database_setup import fill_year_month, rebuild_rollups, rebuild_dimensions, rebuild_search_index, bump_generation, set_job_progress
 
 # --- 상수 정의 ---
-DATABASE_NAME = 'sales.db'
+from database_setup import DATABASE_NAME
 SCOPES = [
     'https://www.googleapis.com/auth/spreadsheets',
     'https://www.googleapis.com/auth/drive'
@@ -25,6 +30,10 @@ BRAND_CONFIG = {
     'curu': {'sheet_tab': 'DB_쿠루', 'table': 'sales_data_curu'}
 }
 
+# DB에 저장하는 컬럼 순서 (월별 해시 계산에도 사용)
+DB_COLUMNS = ['warehouse', 'category', 'month_year', 'item_name', 'quantity', 'series', 'stock', 'backorder']
+INSERT_CHUNK_SIZE = 5000
+
 def clean_number(value):
     """숫자 변환 (콤마 제거)"""
     try:
@@ -47,95 +56,199 @@ def clean_data(df):
 
     return df
 
-def migrate_google_sheet_to_db(target_brand):
-    if target_brand not in BRAND_CONFIG:
-        print(f"오류: 알 수 없는 브랜드 '{target_brand}'")
-        return
+def month_hashes(df):
+    """월(month_year)별 내용 해시와 행 수 (행 순서와 무관)"""
+    row_hash = pd.util.hash_pandas_object(df[DB_COLUMNS], index=False).to_numpy()
+    return {
+        month: (hashlib.sha1(np.sort(row_hash[positions]).tobytes()).hexdigest(), len(positions))
+        for month, positions in df.groupby('month_year').indices.items()
+    }
 
-    config = BRAND_CONFIG[target_brand]
-    tab_name = config['sheet_tab']
-    table_name = config['table']
+def _write_brand_rows(conn, brand, df):
+    """바뀐 월만 교체합니다 (호출한 쪽의 트랜잭션 안에서 실행). 반환: (저장한 행 수, 교체·삭제된 월 목록)"""
+    table_name = BRAND_CONFIG[brand]['table']
+    new_hashes = month_hashes(df)
 
-    conn = None
+    old_hashes = dict(conn.execute("SELECT month_year, content_hash FROM ingest_month_hashes WHERE brand = ?", (brand,)).fetchall())
+    db_months = {row[0] for row in conn.execute(f"SELECT DISTINCT month_year FROM {table_name}")}
+    changed = sorted(m for m, (h, _) in new_hashes.items() if old_hashes.get(m) != h)
+    removed = sorted((db_months | set(old_hashes)) - set(new_hashes))
+    stale = changed + removed
+    if not stale: return 0, []
+
+    placeholders = ', '.join('?' for _ in stale)
+    conn.execute(f"DELETE FROM {table_name} WHERE month_year IN ({placeholders})", stale)
+    conn.execute(f"DELETE FROM ingest_month_hashes WHERE brand = ? AND month_year IN ({placeholders})", [brand, *stale])
+
+    df_changed = df[df['month_year'].isin(changed)]
+    insert_sql = f"INSERT INTO {table_name} ({', '.join(DB_COLUMNS)}) VALUES ({', '.join('?' for _ in DB_COLUMNS)})"
+    rows = df_changed[DB_COLUMNS].astype(object).itertuples(index=False, name=None)
+    while True:
+        chunk = list(islice(rows, INSERT_CHUNK_SIZE))
+        if not chunk: break
+        conn.executemany(insert_sql, chunk)
+    conn.executemany(
+        "INSERT INTO ingest_month_hashes (brand, month_year, content_hash, row_count) VALUES (?, ?, ?, ?)",
+        [(brand, m, *new_hashes[m]) for m in changed]
+    )
+
+    fill_year_month(conn, table_name)
+    # 대시보드용 롤업/차원 테이블도 바뀐 월만 재계산
+    rebuild_rollups(conn, brand, months=stale)
+    rebuild_dimensions(conn, brand, months=stale)
+    # 품목 검색 색인은 품목 목록 전체로 다시 만듦 (품목 수만큼이라 작음)
+    rebuild_search_index(conn, brand)
+    return len(df_changed), stale
+
+def write_brands_data(conn, frames):
+    """여러 브랜드의 정제된 데이터를 내용이 바뀐 월만 교체하는 증분 방식으로 적재합니다.
+
+    원본 교체, year/month 계산, 롤업 재계산, 데이터 세대 증가를 하나의 트랜잭션으로 처리하므로
+    (WAL 모드에서) 대시보드는 적재 도중에도 이전 데이터 전체를 보다가 커밋 순간 새 데이터로 바뀝니다.
+    반환: {brand: (저장한 행 수, 교체·삭제된 월 목록)}
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        results = {brand: _write_brand_rows(conn, brand, df) for brand, df in frames.items()}
+        # [수정] 삭제만 된 월이 있어도 세대를 올려야 캐시된 화면에서 사라짐
+        if any(stale for _, stale in results.values()):
+            # 데이터 세대 번호 증가 → 모든 워커의 캐시 키가 즉시 바뀜
+            bump_generation(conn)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return results
+
+def _report(job_id, brand, stage, rows=None):
+    """백그라운드 작업으로 실행 중이면 진행 단계를 기록"""
+    if job_id: set_job_progress(job_id, brand, stage, rows)
+
+# ---------------------------------------------------------
+# 시트 읽기 단계
+# - client는 gspread.Client와 같은 인터페이스면 됩니다:
+#   client.open(이름) / client.open_by_key(키) → spreadsheet.worksheet(탭 이름)
+#   → worksheet.get_all_records() / worksheet.get_all_values()
+#   (테스트·벤치마크에서는 로컬 가짜 클라이언트로 대체 가능)
+# ---------------------------------------------------------
+def authorize_client():
+    creds = Credentials.from_service_account_file(GOOGLE_CREDENTIALS_FILE, scopes=SCOPES)
+    return gspread.authorize(creds)
+
+def fetch_backorder_map(client):
+    """발주표(미입고잔량) 시트에서 {품목명: 미입고 수량} 매핑을 읽습니다. 실패 시 빈 매핑."""
     try:
-        print(f"[{target_brand.upper()}] 데이터 마이그레이션 시작 (탭: {tab_name})...")
-        creds = Credentials.from_service_account_file(GOOGLE_CREDENTIALS_FILE, scopes=SCOPES)
-        client = gspread.authorize(creds)
+        # open_by_key를 사용하여 외부 시트 열기
+        bo_spreadsheet = client.open_by_key(BACKORDER_SHEET_KEY)
+        bo_sheet = bo_spreadsheet.worksheet(BACKORDER_TAB_NAME)
+        bo_data = bo_sheet.get_all_values() 
         
-        # ---------------------------------------------------------
-        # 1. 판매 데이터 읽기 (기존 시트)
-        # ---------------------------------------------------------
-        spreadsheet = client.open(GOOGLE_SHEET_NAME)
+        bo_map = {}
+        # L열(인덱스 11) 품목명, M열(인덱스 12) 수량 매핑
+        for row in bo_data[1:]:
+            if len(row) > 12:
+                p_name = str(row[11]).strip() # L열
+                qty = clean_number(row[12])   # M열
+                if p_name:
+                    bo_map[p_name] = qty
+        print(f"   - 미입고 정보 로드 완료 (외부 시트 참조, {len(bo_map)}건)")
+        return bo_map
         
-        try:
-            worksheet = spreadsheet.worksheet(tab_name)
-        except gspread.exceptions.WorksheetNotFound:
-            raise Exception(f"구글 시트에서 '{tab_name}' 탭을 찾을 수 없습니다.")
+    except gspread.exceptions.SpreadsheetNotFound:
+        print(f"   ⚠️ 경고: 발주표 시트 ID({BACKORDER_SHEET_KEY})를 찾을 수 없습니다. (공유 권한 확인 필요)")
+    except gspread.exceptions.WorksheetNotFound:
+        print(f"   ⚠️ 경고: 외부 시트에서 '{BACKORDER_TAB_NAME}' 탭을 찾을 수 없습니다.")
+    except Exception as e:
+        print(f"   ⚠️ 발주표 로드 중 알 수 없는 오류: {e}")
+    return {}
 
-        data = worksheet.get_all_records()
-        df = pd.DataFrame(data)
-        
-        expected_columns = ['창고별', '구분', '월별', '품목별', '수량', '시리즈', '재고']
-        if not all(col in df.columns for col in expected_columns):
-             if len(df.columns) >= 7:
-                 df = df.iloc[:, :7]
-                 df.columns = expected_columns
-             else:
-                 raise Exception(f"'{tab_name}' 탭의 컬럼 형식이 맞지 않습니다.")
-        else:
-             df = df[expected_columns]
-
-        df.columns = ['warehouse', 'category', 'month_year', 'item_name', 'quantity', 'series', 'stock']
-
-        # ---------------------------------------------------------
-        # 2. [수정] 발주표(미입고잔량) 데이터 읽기 (외부 시트 접근)
-        # ---------------------------------------------------------
-        try:
-            # open_by_key를 사용하여 외부 시트 열기
-            bo_spreadsheet = client.open_by_key(BACKORDER_SHEET_KEY)
-            bo_sheet = bo_spreadsheet.worksheet(BACKORDER_TAB_NAME)
-            bo_data = bo_sheet.get_all_values() 
-            
-            bo_map = {}
-            # L열(인덱스 11) 품목명, M열(인덱스 12) 수량 매핑
-            for row in bo_data[1:]:
-                if len(row) > 12:
-                    p_name = str(row[11]).strip() # L열
-                    qty = clean_number(row[12])   # M열
-                    if p_name:
-                        bo_map[p_name] = qty
-            
+def fetch_brand_frame(spreadsheet, brand):
+    """판매현황 시트의 브랜드 탭을 DataFrame으로 읽습니다."""
+    tab_name = BRAND_CONFIG[brand]['sheet_tab']
+    print(f"[{brand.upper()}] 데이터 마이그레이션 시작 (탭: {tab_name})...")
+    try:
+        worksheet = spreadsheet.worksheet(tab_name)
+    except gspread.exceptions.WorksheetNotFound:
+        raise Exception(f"구글 시트에서 '{tab_name}' 탭을 찾을 수 없습니다.")
+
+    data = worksheet.get_all_records()
+    df = pd.DataFrame(data)
+    
+    expected_columns = ['창고별', '구분', '월별', '품목별', '수량', '시리즈', '재고']
+    if not all(col in df.columns for col in expected_columns):
+         if len(df.columns) >= 7:
+             df = df.iloc[:, :7]
+             df.columns = expected_columns
+         else:
+             raise Exception(f"'{tab_name}' 탭의 컬럼 형식이 맞지 않습니다.")
+    else:
+         df = df[expected_columns]
+
+    df.columns = ['warehouse', 'category', 'month_year', 'item_name', 'quantity', 'series', 'stock']
+    return df
+
+def fetch_brands(client, brands, job_id=None):
+    """인증된 client로 발주표는 한 번만 읽고, 브랜드 탭들은 동시에 내려받아 정제합니다.
+
+    반환: ({brand: 정제된 DataFrame}, {brand: 예외})
+    """
+    for brand in brands: _report(job_id, brand, 'fetching')
+    spreadsheet = client.open(GOOGLE_SHEET_NAME)
+
+    frames, errors = {}, {}
+    with ThreadPoolExecutor(max_workers=len(brands) + 1) as executor:
+        bo_future = executor.submit(fetch_backorder_map, client)
+        futures = {brand: executor.submit(fetch_brand_frame, spreadsheet, brand) for brand in brands}
+        bo_map = bo_future.result()
+        for brand, future in futures.items():
+            try:
+                df = future.result()
+            except Exception as e:
+                _report(job_id, brand, 'error')
+                errors[brand] = e
+                continue
+            _report(job_id, brand, 'cleaning')
             df['backorder'] = df['item_name'].map(bo_map).fillna(0).astype(int)
-            print(f"   - 미입고 정보 매핑 완료 (외부 시트 참조, {len(bo_map)}건)")
-            
-        except gspread.exceptions.SpreadsheetNotFound:
-            print(f"   ⚠️ 경고: 발주표 시트 ID({BACKORDER_SHEET_KEY})를 찾을 수 없습니다. (공유 권한 확인 필요)")
-            df['backorder'] = 0
-        except gspread.exceptions.WorksheetNotFound:
-            print(f"   ⚠️ 경고: 외부 시트에서 '{BACKORDER_TAB_NAME}' 탭을 찾을 수 없습니다.")
-            df['backorder'] = 0
-        except Exception as e:
-            print(f"   ⚠️ 발주표 로드 중 알 수 없는 오류: {e}")
-            df['backorder'] = 0
-
-        # ---------------------------------------------------------
-        # 3. 데이터 정제 및 저장
-        # ---------------------------------------------------------
-        df_cleaned = clean_data(df)
-
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        cursor.execute(f"DELETE FROM {table_name}")
-        df_cleaned.to_sql(table_name, conn, if_exists='append', index=False)
-        conn.commit()
-
-        print(f"성공: {len(df_cleaned)}행 저장 완료.")
+            frames[brand] = clean_data(df)
+    return frames, errors
+
+def migrate_brands(brands, job_id=None, client=None):
+    """여러 브랜드를 한 번에 적재합니다 (인증/발주표 1회, 탭 동시 다운로드, 한 트랜잭션 저장).
+
+    반환: {brand: 실패 예외} (모두 성공하면 빈 딕셔너리)
+    """
+    conn = None
+    errors = {}
+    try:
+        if client is None: client = authorize_client()
+        frames, errors = fetch_brands(client, brands, job_id)
+        if not frames: return errors
 
+        for brand in frames: _report(job_id, brand, 'writing')
+        # [수정] DELETE 후 전체 재기록 대신, 바뀐 월만 하나의 트랜잭션에서 교체
+        conn = sqlite3.connect(DATABASE_NAME, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        results = write_brands_data(conn, frames)
     except Exception as e:
+        for brand in brands:
+            if brand not in errors: _report(job_id, brand, 'error')
         raise e
     finally:
         if conn: conn.close()
 
+    for brand, (written, stale) in results.items():
+        print(f"[{brand.upper()}] 성공: 전체 {len(frames[brand])}행 중 {written}행 저장 완료. (변경·삭제된 월: {len(stale)}개)")
+        _report(job_id, brand, 'done', written)
+    return errors
+
+def migrate_google_sheet_to_db(target_brand, job_id=None, client=None):
+    if target_brand not in BRAND_CONFIG:
+        print(f"오류: 알 수 없는 브랜드 '{target_brand}'")
+        return
+
+    errors = migrate_brands([target_brand], job_id, client)
+    if errors: raise errors[target_brand]
+
 if __name__ == '__main__':
     from database_setup import create_table, BRANDS
     
@@ -144,24 +257,24 @@ if __name__ == '__main__':
     
     if len(sys.argv) > 1:
         brand_arg = sys.argv[1]
+        # 웹에서 백그라운드 작업으로 실행한 경우: python migrate_data.py all --job <job_id>
+        job_arg = sys.argv[3] if len(sys.argv) > 3 and sys.argv[2] == '--job' else None
         
         if brand_arg == 'all':
             print("\n" + "="*50)
             print(f"   [전체 브랜드] 데이터 통합 업데이트 시작 (대상: {', '.join(BRANDS)})")
             print("="*50 + "\n")
             
-            success_count = 0
-            fail_count = 0
-            
-            for brand in BRANDS:
-                try:
-                    migrate_google_sheet_to_db(brand)
-                    print("")
-                    success_count += 1
-                except Exception as e:
-                    print(f"!!! [{brand.upper()}] 실패: {e}\n")
-                    fail_count += 1
+            try:
+                # [수정] 인증·발주표 다운로드는 한 번만, 브랜드 탭은 동시에 읽고 한 트랜잭션으로 저장
+                errors = migrate_brands(BRANDS, job_id=job_arg)
+            except Exception as e:
+                errors = {brand: e for brand in BRANDS}
+            for brand, e in errors.items():
+                print(f"!!! [{brand.upper()}] 실패: {e}\n")
             
+            fail_count = len(errors)
+            success_count = len(BRANDS) - fail_count
             print("="*50)
             print(f"   전체 업데이트 종료 (성공: {success_count}, 실패: {fail_count})")
             print("="*50)
@@ -169,9 +282,9 @@ if __name__ == '__main__':
             if fail_count > 0: sys.exit(1)
         else:
             try:
-                migrate_google_sheet_to_db(brand_arg)
+                migrate_google_sheet_to_db(brand_arg, job_id=job_arg)
             except Exception as e:
                 print(f"오류: {e}")
                 sys.exit(1)
     else:
-        print("사용법: python migrate_data.py [nine|curu|all]")
\ No newline at end of file
+        print("사용법: python migrate_data.py [nine|curu|all] [--job <job_id>]")